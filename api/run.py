@@ -1,12 +1,18 @@
+import os
+import sys
 import requests
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client
+
 def main():
     api_key = input("🔑 Please enter your API key: ").strip()
-    url = f"http://api.qr-code-generator.com/v1/access-tokens?access-token={api_key}"
+    url = client.v1_url(f"access-tokens?access-token={api_key}")
 
     try:
-        response = requests.get(url)
+        response = client.get(url, throttle=False)
 
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,321 @@
+"""Local stand-in for the QR Code Generator v1 and v3 APIs.
+
+Serves the endpoints the scripts call (``/v1/access-tokens``, ``/v1/account``,
+``/v1/codes``, ``/v1/codes/{id}``, ``/v1/export/{id}`` and ``/v3/qrcodes/{id}``)
+from in-memory accounts, one per token, with configurable latency, a
+per-token rate limit, randomly injected 429s and a monthly quota. Nothing
+leaves the machine. ``bench/run.py`` starts it in-process; it can also run
+on its own for manual testing:
+
+    python bench/mock_api.py --codes 2000 --folder-codes 200
+    export QRCG_V1_BASE=http://127.0.0.1:8765/v1 QRCG_V3_BASE=http://127.0.0.1:8765/v3
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+REBUILD_FOLDER_ID = 7
+REBUILD_FOLDER = "REBUILDS"
+# Codes are a year old, so granular exports always span the same number of date windows.
+CODE_AGE_DAYS = 365
+EXPORT_HEADER = "Date/time,Country Name,Country ISO,City,Device,Operating System,Unique Visitor\n"
+TYPE_NAMES = {1: "Website", 2: "vCard Plus", 5: "PDF", 13: "Coupon"}
+
+CODE_PATH = re.compile(r"/v1/codes/(\d+)$")
+EXPORT_PATH = re.compile(r"/v1/export/(\d+)$")
+DESIGN_PATH = re.compile(r"/v3/qrcodes/(\d+)$")
+
+
+class Account:
+    def __init__(self, token, rate_limit):
+        self.token = token
+        self.codes = {}
+        self.folders = {REBUILD_FOLDER_ID: REBUILD_FOLDER}
+        self.used = 0
+        self.rate_limit = rate_limit
+        self.tokens = float(rate_limit)
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Token bucket per account; returns the seconds to wait, 0 if the request may go ahead."""
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit, self.tokens + (now - self.updated) * self.rate_limit)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate_limit
+
+    def listing(self, folder_id=None):
+        # Newest first, like the real API.
+        codes = reversed(list(self.codes.values()))
+        if folder_id:
+            return [code for code in codes if code["folder_id"] == folder_id]
+        return list(codes)
+
+
+class MockAPI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.02, rate_limit=50, error_rate=0.0, retry_after=1.0,
+                 monthly_limit=100000):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.monthly_limit = monthly_limit
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1000)
+        self.reset()
+
+    @property
+    def v1_base(self):
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    @property
+    def v3_base(self):
+        return f"http://127.0.0.1:{self.server_port}/v3"
+
+    def reset(self):
+        with self.lock:
+            self.accounts = {}
+            self.requests = 0
+            self.statuses = Counter()
+
+    def add_account(self, token, codes=0, folder_codes=0):
+        """Create an account for ``token`` with ``codes`` QR Codes, ``folder_codes`` of them in REBUILDS."""
+        account = Account(token, self.rate_limit)
+        created = (datetime.now() - timedelta(days=CODE_AGE_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        for i in range(codes):
+            in_folder = i < folder_codes
+            # Everything in REBUILDS is a dynamic Website code, the rest is a mix.
+            dynamic = in_folder or i % 3
+            type_id = 1 if in_folder else (1, 2, 5, 13)[i % 4]
+            code = self.new_code(type_id, f"Code {i}", f"https://example.com/{i}", created, dynamic)
+            code.update(total_scans=i % 50, unique_scans=i % 20, folder_id=REBUILD_FOLDER_ID if in_folder else 0)
+            account.codes[code["id"]] = code
+        with self.lock:
+            self.accounts[token] = account
+        return account
+
+    def new_code(self, type_id, title, target_url, created, dynamic=True):
+        code_id = next(self.ids)
+        short_code = f"m{code_id:x}"
+        return {
+            "id": code_id, "type_id": type_id, "type_name": TYPE_NAMES.get(type_id, "Website"), "title": title,
+            "short_code": short_code if dynamic else "", "short_url": f"https://qrco.de/{short_code}" if dynamic else "",
+            "target_url": target_url, "created": created, "status": "active", "total_scans": 0, "unique_scans": 0,
+            "folder_id": 0,
+        }
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections after a retry or a timeout; only real failures are worth a traceback.
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    def serve_in_background(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body=None, content_type="application/json", headers=None):
+        if body is None:
+            data = b""
+        elif isinstance(body, str):
+            data = body.encode()
+        else:
+            data = json.dumps(body).encode()
+
+        with self.server.lock:
+            self.server.statuses[status] += 1
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def token(self, query):
+        token = query.get("access-token")
+        auth = self.headers.get("Authorization", "")
+        if not token and auth.startswith("Key "):
+            token = auth[4:]
+        return token
+
+    def handle_method(self, method):
+        server = self.server
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null") if length else None
+
+        # Token info is informational, so it is neither paced nor counted against the quota.
+        metered = url.path != "/v1/access-tokens"
+        wait, exhausted = 0, False
+        with server.lock:
+            server.requests += 1
+            account = server.accounts.get(self.token(query))
+            if account is not None and metered:
+                wait = account.take()
+                exhausted = account.used >= server.monthly_limit
+                if not wait and not exhausted:
+                    account.used += 1
+
+        if account is None:
+            return self.send(401, {"message": "Invalid access token"})
+        if wait:
+            return self.send(429, {"message": "Too many requests"}, headers={"Retry-After": f"{wait:.2f}"})
+        if exhausted:
+            return self.send(403, {"message": "Monthly request limit reached"})
+        if server.error_rate and random.random() < server.error_rate:
+            return self.send(429, {"message": "Too many requests"}, headers={"Retry-After": str(server.retry_after)})
+
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            response = self.route(method, url.path, query, body, account)
+        self.send(*response)
+
+    def route(self, method, path, query, body, account):
+        """Return ``(status, body[, content_type])``; runs under the server lock."""
+        if path == "/v1/access-tokens":
+            return 200, {"items": [{
+                "id": 1, "token": account.token, "enabled": True, "rate_limit": self.server.rate_limit,
+                "rate_limit_month": self.server.monthly_limit,
+                "rate_number_month": max(0, self.server.monthly_limit - account.used),
+            }]}
+
+        if path == "/v1/account" and method == "GET":
+            folders = Counter(code["folder_id"] for code in account.codes.values())
+            return 200, {
+                "qrcodes": {"activeTotalCodes": len(account.codes)},
+                "folders": [{"id": folder_id, "name": name, "qrcodes": folders[folder_id]}
+                            for folder_id, name in account.folders.items()],
+            }
+
+        if path == "/v1/codes" and method == "GET":
+            page = int(query.get("page", 1))
+            per_page = int(query.get("per-page", 20))
+            codes = account.listing(int(query.get("folder_id") or 0))
+            return 200, codes[(page - 1) * per_page:page * per_page]
+
+        if path == "/v1/codes" and method == "POST":
+            code = self.server.new_code(body.get("typeId", 1), body.get("title"), (body.get("data") or {}).get("url"),
+                                        datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            account.codes[code["id"]] = code
+            return 200, code
+
+        match = CODE_PATH.match(path)
+        if match:
+            code = account.codes.get(int(match.group(1)))
+            if code is None:
+                return 404, {"message": "QR Code not found"}
+            if method == "GET":
+                return 200, code
+            if method == "PUT":
+                code.update(body or {})
+                if "short_code" in (body or {}):
+                    code["short_url"] = f"https://qrco.de/{code['short_code']}"
+                return 200, code
+            if method == "DELETE":
+                del account.codes[code["id"]]
+                return 204, None
+
+        match = EXPORT_PATH.match(path)
+        if match and method == "GET":
+            code = account.codes.get(int(match.group(1)))
+            if code is None:
+                return 404, {"message": "QR Code not found"}
+            return 200, export_csv(code, query.get("from"), query.get("to")), "text/csv"
+
+        match = DESIGN_PATH.match(path)
+        if match:
+            code = account.codes.get(int(match.group(1)))
+            if code is None:
+                return 404, {"message": "QR Code not found"}
+            if method == "GET":
+                return 200, {
+                    "title": code["title"], "url": code["target_url"], "status": code["status"],
+                    "customizations": {"color": "#1a1a1a", "frame": "banner", "logo": {"name": "account-logo"}},
+                }
+            if method == "PATCH":
+                return 200, {}
+
+        return 404, {"message": "Not found"}
+
+    def do_GET(self):
+        self.handle_method("GET")
+
+    def do_POST(self):
+        self.handle_method("POST")
+
+    def do_PUT(self):
+        self.handle_method("PUT")
+
+    def do_PATCH(self):
+        self.handle_method("PATCH")
+
+    def do_DELETE(self):
+        self.handle_method("DELETE")
+
+
+def export_csv(code, from_date=None, to_date=None):
+    """One scan per day between ``from_date`` and ``to_date``."""
+    start = datetime.strptime(from_date or code["created"][:10], "%Y-%m-%d").date()
+    end = datetime.strptime(to_date, "%Y-%m-%d").date() if to_date else date.today()
+
+    rows = [EXPORT_HEADER]
+    day = start
+    while day <= end:
+        rows.append(f"{day.isoformat()} 12:00:00,Germany,DE,Berlin,Smartphone,iOS,{day.day % 2}\n")
+        day += timedelta(days=1)
+    return "".join(rows)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve a local mock of the QR Code Generator API.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens", default="token-a,token-b", help="comma-separated tokens, one account each")
+    parser.add_argument("--codes", type=int, default=1000, help="QR Codes in the first account")
+    parser.add_argument("--folder-codes", type=int, default=100, help="of those, how many are in REBUILDS")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every response")
+    parser.add_argument("--rate-limit", type=float, default=50, help="requests per second per token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--monthly-limit", type=int, default=100000, help="requests per token per month")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = MockAPI(("127.0.0.1", args.port), latency=args.latency, rate_limit=args.rate_limit,
+                     error_rate=args.error_rate, retry_after=args.retry_after, monthly_limit=args.monthly_limit)
+
+    tokens = [token.strip() for token in args.tokens.split(",") if token.strip()]
+    for n, token in enumerate(tokens):
+        server.add_account(token, codes=args.codes if n == 0 else 0, folder_codes=args.folder_codes if n == 0 else 0)
+
+    print(f"🧪 Mock API on http://127.0.0.1:{server.server_port} with tokens: {', '.join(tokens)}")
+    print(f"export QRCG_V1_BASE={server.v1_base} QRCG_V3_BASE={server.v3_base}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,306 @@
+"""End-to-end throughput benchmarks for the scripts, fully offline.
+
+Every scenario runs one of the real scripts as a subprocess against
+``mock_api.py`` (via ``QRCG_V1_BASE`` / ``QRCG_V3_BASE``), answers its
+prompts on stdin, checks the mock account ended up as expected and reports
+requests/sec, wall time and peak RSS. Results are compared with
+``bench/baselines.json``; ``--save-baseline`` rewrites it.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from mock_api import MockAPI, REBUILD_FOLDER_ID
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+TOKEN_A = "bench-token-a"
+TOKEN_B = "bench-token-b"
+
+# Slower or fatter than the baseline by more than this counts as a regression.
+TOLERANCE = 0.2
+TIMEOUT = 600
+
+
+# -------------------------
+# SCENARIOS
+# -------------------------
+# Each one seeds the mock and returns (script and arguments, stdin answers, check).
+
+def stats_scenario(server, workdir, size):
+    server.add_account(TOKEN_A, codes=size)
+
+    def check():
+        exports = glob.glob(os.path.join(workdir, "csv-exports", "QR_CODE_DATA_*.csv"))
+        return bool(exports) and count_rows(exports[0]) == size
+
+    return ["stats/run.py"], [TOKEN_A, "y", "n"], check
+
+
+def granular_scenario(server, workdir, size):
+    size = max(1, size // 10)
+    account = server.add_account(TOKEN_A, codes=size)
+    codes_csv = write_codes_csv(workdir, "codes.csv", account.codes.values())
+
+    def check():
+        return len(glob.glob(os.path.join(workdir, "csv-exports", "qr-code-exports", "*.csv"))) == size
+
+    return ["stats/granular_statistics.py"], [TOKEN_A, codes_csv, "n", "y", "n"], check
+
+
+def delete_scenario(server, workdir, size, pipelined=False):
+    account = server.add_account(TOKEN_A, codes=size + size // 10, folder_codes=size)
+
+    def check():
+        return not account.listing(REBUILD_FOLDER_ID) and len(account.codes) == size // 10
+
+    # Folder 1 is REBUILDS.
+    return ["delete/run.py"], [TOKEN_A, "1", "y" if pipelined else "n", "y", "y"], check
+
+
+def delete_pipelined_scenario(server, workdir, size):
+    return delete_scenario(server, workdir, size, pipelined=True)
+
+
+def delete_csv_scenario(server, workdir, size):
+    account = server.add_account(TOKEN_A, codes=size)
+    codes = list(account.codes.values())
+    # Every ID twice, so duplicate detection is part of the run.
+    ids_csv = write_codes_csv(workdir, "ids.csv", codes + codes)
+
+    def check():
+        return not account.codes
+
+    return ["delete/delete_from_csv.py"], [TOKEN_A, ids_csv, "y"], check
+
+
+def rebuild_scenario(server, workdir, size, stream=False):
+    size = max(1, size // 5)
+    account_a = server.add_account(TOKEN_A, codes=size * 2, folder_codes=size)
+    account_b = server.add_account(TOKEN_B)
+    old_urls = {code["short_url"] for code in account_a.listing(REBUILD_FOLDER_ID)}
+
+    def check():
+        new_urls = {code["short_url"] for code in account_b.codes.values()}
+        return not account_a.listing(REBUILD_FOLDER_ID) and new_urls == old_urls
+
+    return ["rebuild/run.py"] + (["--stream"] if stream else []), [TOKEN_A, TOKEN_B], check
+
+
+def rebuild_stream_scenario(server, workdir, size):
+    return rebuild_scenario(server, workdir, size, stream=True)
+
+
+SCENARIOS = {
+    "stats": stats_scenario,
+    "granular": granular_scenario,
+    "delete": delete_scenario,
+    "delete-pipelined": delete_pipelined_scenario,
+    "delete-csv": delete_csv_scenario,
+    "rebuild": rebuild_scenario,
+    "rebuild-stream": rebuild_stream_scenario,
+}
+
+
+def write_codes_csv(workdir, name, codes):
+    path = os.path.join(workdir, name)
+    fieldnames = ["ID", "Title", "Created", "Total Scans", "Unique Scans"]
+    with open(path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        for code in codes:
+            writer.writerow({"ID": code["id"], "Title": code["title"], "Created": code["created"],
+                             "Total Scans": code["total_scans"], "Unique Scans": code["unique_scans"]})
+    return path
+
+
+def count_rows(path):
+    with open(path, mode="r", encoding="utf-8") as file:
+        return sum(1 for _ in csv.DictReader(file))
+
+
+# -------------------------
+# RUNNER
+# -------------------------
+def peak_rss_mb(rusage):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_script(argv, answers, workdir, env, log_path):
+    """Run a script to completion; returns (exit code, wall seconds, peak RSS in MB or None)."""
+    with open(log_path, mode="w", encoding="utf-8") as log:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable] + argv, cwd=workdir, env=env, stdin=subprocess.PIPE,
+                                   stdout=log, stderr=subprocess.STDOUT, text=True)
+        timer = threading.Timer(TIMEOUT, process.kill)
+        timer.start()
+        try:
+            process.stdin.write("\n".join(answers) + "\n")
+            process.stdin.close()
+            if hasattr(os, "wait4"):
+                _, status, rusage = os.wait4(process.pid, 0)
+                wall = time.perf_counter() - started
+                return os.waitstatus_to_exitcode(status), wall, peak_rss_mb(rusage)
+            code = process.wait()
+            return code, time.perf_counter() - started, None
+        finally:
+            timer.cancel()
+
+
+def run_scenario(name, server, size, keep=False):
+    workdir = tempfile.mkdtemp(prefix=f"qrcg-bench-{name}-")
+    server.reset()
+    argv, answers, check = SCENARIOS[name](server, workdir, size)
+
+    env = dict(os.environ)
+    env.update({
+        "QRCG_V1_BASE": server.v1_base,
+        "QRCG_V3_BASE": server.v3_base,
+        "QRCG_CACHE_DIR": os.path.join(workdir, "cache"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    log_path = os.path.join(workdir, "output.log")
+    script = os.path.join(REPO_ROOT, argv[0])
+
+    code, wall, rss = run_script([script] + argv[1:], answers, workdir, env, log_path)
+    ok = code == 0 and check()
+    result = {
+        "requests": server.requests,
+        "requests_per_s": round(server.requests / wall, 1) if wall else 0.0,
+        "wall_s": round(wall, 2),
+        "peak_rss_mb": round(rss, 1) if rss is not None else None,
+        "throttled": server.statuses[429],
+        "ok": ok,
+    }
+
+    if not ok:
+        print(f"❌ {name} failed (exit code {code}), see {log_path}")
+    elif not keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+# -------------------------
+# BASELINES
+# -------------------------
+def load_baselines(path=BASELINE_FILE):
+    try:
+        with open(path, mode="r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baselines(results, settings, path=BASELINE_FILE):
+    with open(path, mode="w", encoding="utf-8") as file:
+        json.dump({"settings": settings, "results": results}, file, indent=2, sort_keys=True)
+        file.write("\n")
+    print(f"💾 Baselines saved to {path}")
+
+
+def regressions(result, baseline):
+    found = []
+    if result["wall_s"] > baseline["wall_s"] * (1 + TOLERANCE):
+        found.append("wall time")
+    if baseline.get("peak_rss_mb") and result["peak_rss_mb"] and \
+            result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + TOLERANCE):
+        found.append("memory")
+    if result["requests"] > baseline["requests"] * (1 + TOLERANCE):
+        found.append("request count")
+    return found
+
+
+def change(value, baseline):
+    if not baseline or value is None:
+        return ""
+    return f" ({(value - baseline) / baseline:+.0%})"
+
+
+def print_results(results, baselines):
+    print(f"\n{'SCENARIO':<18}{'REQUESTS':>10}{'REQ/S':>12}{'WALL S':>16}{'PEAK RSS MB':>18}{'429s':>7}  RESULT")
+    failed = False
+    for name, result in results.items():
+        baseline = (baselines or {}).get(name)
+        problems = regressions(result, baseline) if baseline and result["ok"] else []
+        failed = failed or problems or not result["ok"]
+
+        if not result["ok"]:
+            verdict = "❌ failed"
+        elif problems:
+            verdict = f"⚠️  slower than baseline: {', '.join(problems)}"
+        else:
+            verdict = "✅"
+
+        rss = result["peak_rss_mb"]
+        print(f"{name:<18}{result['requests']:>10}"
+              f"{str(result['requests_per_s']) + change(result['requests_per_s'], baseline and baseline['requests_per_s']):>12}"
+              f"{str(result['wall_s']) + change(result['wall_s'], baseline and baseline['wall_s']):>16}"
+              f"{(str(rss) if rss is not None else 'n/a') + change(rss, baseline and baseline.get('peak_rss_mb')):>18}"
+              f"{result['throttled']:>7}  {verdict}")
+    return failed
+
+
+# -------------------------
+# ENTRY POINT
+# -------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the scripts end to end against a local mock API and compare "
+                                                 "requests/s, wall time and peak memory with the saved baselines.")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                        help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--size", type=int, default=500,
+                        help="QR Codes per scenario (granular exports use a tenth, rebuilds a fifth)")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the mock adds to every response")
+    parser.add_argument("--rate-limit", type=float, default=50, help="requests per second per token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with a 429")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baselines")
+    parser.add_argument("--keep", action="store_true", help="keep each scenario's working folder and output log")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    names = args.scenarios or list(SCENARIOS)
+    settings = {"size": args.size, "latency": args.latency, "rate_limit": args.rate_limit,
+                "error_rate": args.error_rate}
+
+    server = MockAPI(latency=args.latency, rate_limit=args.rate_limit, error_rate=args.error_rate)
+    server.serve_in_background()
+    print(f"🧪 Mock API on {server.v1_base} ({args.latency * 1000:.0f}ms latency, {args.rate_limit:g} req/s per token)")
+
+    results = {}
+    for name in names:
+        print(f"▶️  {name}...")
+        results[name] = run_scenario(name, server, args.size, keep=args.keep)
+    server.shutdown()
+
+    saved = load_baselines()
+    baselines = None
+    if saved and saved.get("settings") == settings:
+        baselines = saved["results"]
+    elif saved:
+        print("⚠️  Baselines were recorded with different settings, not comparing")
+
+    failed = print_results(results, baselines)
+
+    if args.save_baseline:
+        merged = dict(saved["results"]) if saved and saved.get("settings") == settings else {}
+        merged.update({name: result for name, result in results.items() if result["ok"]})
+        save_baselines(merged, settings)
+
+    sys.exit(1 if failed else 0)
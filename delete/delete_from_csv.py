@@ -1,12 +1,20 @@
 import csv
 import os
-import time
-import requests
+import sys
+from array import array
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
 
-API_BASE = "https://api.qr-code-generator.com/v1"
-THROTTLE_DELAY = 0.11 
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import bulk, client, concurrency, quota
+
+API_BASE = client.V1_BASE
+# Threads only; how many deletes actually run at once is up to qrcg.concurrency.
+DELETE_WORKERS = concurrency.MAX_LIMIT
 
 
 def get_api_key():
@@ -18,58 +26,165 @@ def get_csv_path():
     return Path(path).expanduser()
 
 
-def read_ids_from_csv(csv_path):
+class SeenIds:
+    """Set of QR Code IDs for duplicate detection on very large CSVs.
+
+    Numeric IDs live in a flat open-addressing table of 64-bit slots, about
+    16 bytes per ID instead of ~70 for a Python set of ints. Anything that
+    is not a non-negative integer falls back to a regular set.
+    """
+
+    EMPTY = -1
+
+    def __init__(self, capacity=1024):
+        self.slots = array("q", [self.EMPTY]) * capacity
+        self.count = 0
+        self.other = set()
+
+    def _index(self, value, mask):
+        # Fibonacci hashing spreads runs of sequential IDs across the table.
+        return ((value * 0x9E3779B97F4A7C15) >> 16) & mask
+
+    def _insert(self, slots, value):
+        mask = len(slots) - 1
+        i = self._index(value, mask)
+        while slots[i] != self.EMPTY:
+            if slots[i] == value:
+                return False
+            i = (i + 1) & mask
+        slots[i] = value
+        return True
+
+    def _grow(self):
+        slots = array("q", [self.EMPTY]) * (len(self.slots) * 2)
+        for value in self.slots:
+            if value != self.EMPTY:
+                self._insert(slots, value)
+        self.slots = slots
+
+    def add(self, raw):
+        """Record ``raw`` and return True if it had not been seen before."""
+        value = int(raw) if raw.isascii() and raw.isdigit() else None
+        if value is None or value >= 2 ** 63:
+            if raw in self.other:
+                return False
+            self.other.add(raw)
+            return True
+
+        if (self.count + 1) * 2 > len(self.slots):
+            self._grow()
+        if self._insert(self.slots, value):
+            self.count += 1
+            return True
+        return False
+
+
+def find_id_column(csv_path):
     if not csv_path.exists():
         print(f"❌ File not found: {csv_path}")
-        return []
+        return None
 
-    ids = []
     with csv_path.open(newline="", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
         if not reader.fieldnames:
             print("❌ CSV appears empty or missing headers.")
-            return []
+            return None
 
         cols_lower = {c.lower(): c for c in reader.fieldnames}
         if "id" not in cols_lower:
             print(f"❌ CSV missing required column 'ID'. Found columns: {reader.fieldnames}")
-            return []
+            return None
+
+        return cols_lower["id"]
 
-        id_col = cols_lower["id"]
-        seen = set()
-        for row in reader:
+
+def iter_id_rows(csv_path, id_col):
+    with csv_path.open(newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
             raw = (row.get(id_col) or "").strip()
-            if not raw or raw in seen:
-                continue
-            seen.add(raw)
-            ids.append(raw)
+            if raw:
+                yield raw
 
-    return ids
+
+def iter_ids(csv_path, id_col):
+    """Yield each ID once, reading the CSV lazily."""
+    seen = SeenIds()
+    for raw in iter_id_rows(csv_path, id_col):
+        if seen.add(raw):
+            yield raw
 
 
 def delete_code(api_key, code_id):
     url = f"{API_BASE}/codes/{code_id}?access-token={api_key}"
-    resp = requests.delete(url)
+    try:
+        resp = client.delete(url)
+    except requests.exceptions.RequestException as e:
+        print(f"⚠️  Failed to delete ID {code_id}: {e}")
+        return False
     if resp.status_code == 204:
         return True
+    elif resp.status_code == 404:
+        # A retried DELETE whose first attempt already went through.
+        print(f"ID {code_id} was already deleted")
+        return True
     else:
         print(f"⚠️  Failed to delete ID {code_id}: {resp.status_code} - {resp.text}")
         return False
 
 
-def write_report(deleted_ids):
+class Report:
+    """Timestamped deletion report, appended to as each deletion succeeds."""
+
+    def __init__(self):
+        out_dir = Path("csv-exports")
+        out_dir.mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.path = out_dir / f"deleted_qr_codes_{timestamp}.csv"
+        self.file = self.path.open("w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["id"])
+        self.file.flush()
+        self.count = 0
+
+    def write(self, cid):
+        self.writer.writerow([cid])
+        self.file.flush()
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+        if self.count:
+            print(f"\n✅ Deletion report saved to: {self.path}")
+        else:
+            self.path.unlink()
+
+
+def save_postponed(ids):
+    """Write IDs left for a later run to a CSV the tool accepts as input; returns its path."""
     out_dir = Path("csv-exports")
     out_dir.mkdir(exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    out_path = out_dir / f"deleted_qr_codes_{timestamp}.csv"
-
-    with out_path.open("w", newline="", encoding="utf-8") as f:
+    path = out_dir / f"postponed_deletions_{timestamp}.csv"
+    with path.open("w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["id"])
-        for cid in deleted_ids:
-            writer.writerow([cid])
+        writer.writerow(["ID"])
+        writer.writerows([cid] for cid in ids)
+    return path
+
+
+def delete_ids(api_key, ids, report, total, workers=DELETE_WORKERS):
+    processed = 0
 
-    print(f"\n✅ Deletion report saved to: {out_path}")
+    def settle(cid, deleted):
+        nonlocal processed
+        processed += 1
+        if deleted:
+            print(f"[{processed}/{total}] Deleted ID: {cid}")
+            report.write(cid)
+        else:
+            print(f"[{processed}/{total}] Skipped ID: {cid}")
+
+    bulk.run_bounded(lambda cid: delete_code(api_key, cid), ids, settle, workers)
 
 
 def main():
@@ -81,31 +196,42 @@ def main():
         return
 
     csv_path = get_csv_path()
-    ids = read_ids_from_csv(csv_path)
+    id_col = find_id_column(csv_path)
+    if not id_col:
+        return
 
-    if not ids:
+    # Counting is a streaming pass; the IDs themselves are read again while deleting.
+    total = sum(1 for _ in iter_ids(csv_path, id_col))
+    if not total:
         print("❌ No valid IDs found in CSV.")
         return
 
-    print(f"\nLoaded {len(ids)} unique ID(s) from {csv_path}")
+    print(f"\nLoaded {total} unique ID(s) from {csv_path}")
+
+    count = quota.plan("Delete from CSV", total, {api_key: 1}, unit_name="IDs")
+    if not count:
+        print("Operation cancelled.")
+        return
+    if count < total:
+        print(f"Only the first {count} ID(s) will be deleted.")
     confirm = input("You are about to permanently delete these QR Codes. Proceed? (y/n): ").strip().lower()
     if confirm != "y":
         print("Operation cancelled.")
         return
 
-    deleted = []
-    for i, cid in enumerate(ids, start=1):
-        ok = delete_code(api_key, cid)
-        if ok:
-            print(f"[{i}/{len(ids)}] Deleted ID: {cid}")
-            deleted.append(cid)
-        else:
-            print(f"[{i}/{len(ids)}] Skipped ID: {cid}")
-        time.sleep(THROTTLE_DELAY)
+    if count < total:
+        postponed = save_postponed(islice(iter_ids(csv_path, id_col), count, None))
+        print(f"The other {total - count} ID(s) were saved to {postponed}; run the tool on that file once the quota resets.")
+        total = count
 
-    if deleted:
-        write_report(deleted)
-    else:
+    report = Report()
+    try:
+        delete_ids(api_key, islice(iter_ids(csv_path, id_col), total), report, total)
+    finally:
+        report.close()
+        concurrency.report()
+
+    if not report.count:
         print("No QR Codes were deleted.")
 
     print("\n✅ Process complete.")
@@ -1,21 +1,44 @@
-import requests
 import csv
 import os
-import time
+import sys
+import threading
+from itertools import islice
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import bulk, client, concurrency, quota
+from qrcg.records import QRCode
 
-API_BASE = "http://api.qr-code-generator.com/v1"
+API_BASE = client.V1_BASE
+PER_PAGE = 100
+# Threads only; how many deletes actually run at once is up to qrcg.concurrency.
+DELETE_WORKERS = concurrency.MAX_LIMIT
+
+REPORT_FIELDS = [
+    'id', 'type_id', 'type_name', 'title',
+    'short_code', 'short_url', 'target_url'
+]
 
 def get_api_key():
     return input("Enter your API key: ").strip()
 
 def get_account_info(api_key):
     url = f"{API_BASE}/account?access-token={api_key}&expand=folders,statistics"
-    response = requests.get(url)
+    response = client.get_cached(url)
     if response.status_code != 200:
         print(f"Failed to fetch account info: {response.status_code} - {response.text}")
         exit(1)
     return response.json()
 
+def folder_size(account_data, folder_id):
+    """Codes in the folder according to the account info, or the account total as an upper bound."""
+    for folder in account_data.get("folders", []):
+        if folder.get("id") == folder_id and isinstance(folder.get("qrcodes"), int):
+            return folder["qrcodes"]
+    return (account_data.get("qrcodes") or {}).get("activeTotalCodes")
+
 def choose_folder(folders):
     print("\nChoose a folder:")
     for idx, folder in enumerate(folders, start=1):
@@ -32,69 +55,113 @@ def choose_folder(folders):
                 return 0, "ALL QR CODES"
         print("Invalid selection. Try again.")
 
+def get_qr_code_page(api_key, folder_id, page):
+    url = f"{API_BASE}/codes?access-token={api_key}&per-page={PER_PAGE}&page={page}&folder_id={folder_id}"
+    response = client.get(url)
+    if response.status_code != 200:
+        print(f"Failed to fetch QR codes on page {page}: {response.status_code} - {response.text}")
+        return None
+    return [QRCode.from_api(code) for code in response.json()]
+
 def get_qr_codes(api_key, folder_id):
     all_codes = []
     page = 1
 
     while True:
-        url = f"{API_BASE}/codes?access-token={api_key}&per-page=100&page={page}&folder_id={folder_id}"
-        response = requests.get(url)
-        if response.status_code != 200:
-            print(f"Failed to fetch QR codes on page {page}: {response.status_code} - {response.text}")
-            break
-        codes = response.json()
+        codes = get_qr_code_page(api_key, folder_id, page)
         if not codes:
             break
         all_codes.extend(codes)
-        if len(codes) < 100:
+        if len(codes) < PER_PAGE:
             break
         page += 1
-        time.sleep(0.11)  # Throttle to stay under 10 requests/sec
 
     return all_codes
 
-def delete_qr_codes(api_key, qr_codes):
-    deleted_codes_info = []
-
-    for code in qr_codes:
-        code_id = code['id']
-        url = f"https://api.qr-code-generator.com/v1/codes/{code_id}?access-token={api_key}"
-        response = requests.delete(url)
-        if response.status_code == 204:
-            print(f"Deleted QR Code ID: {code_id}")
-            deleted_codes_info.append(code)
-        else:
-            print(f"Failed to delete QR Code ID {code_id}: {response.status_code} - {response.text}")
-        time.sleep(0.11)  # Throttle to avoid rate limits
-
-    return deleted_codes_info
-
-def write_csv_report(deleted_codes):
-    directory = 'csv-exports'
-    filename = 'deleted_qr_codes.csv'
-    file_path = os.path.join(directory, filename)
-
-    os.makedirs(directory, exist_ok=True)
-
-    with open(file_path, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=[
-            'id', 'type_id', 'type_name', 'title',
-            'short_code', 'short_url', 'target_url'
-        ])
-        writer.writeheader()
-
-        for code in deleted_codes:
-            writer.writerow({
-                'id': code.get('id'),
-                'type_id': code.get('type_id'),
-                'type_name': code.get('type_name'),
-                'title': code.get('title'),
-                'short_code': code.get('short_code'),
-                'short_url': code.get('short_url'),
-                'target_url': code.get('target_url')
-            })
-
-    print(f"\nCSV report saved as '{file_path}'.")
+def iter_qr_codes_while_deleting(api_key, folder_id, stats):
+    """Yield every code in the folder while it is being emptied.
+
+    Deletions shift later codes onto earlier pages, so the folder is walked
+    again from page 1 until a walk finds nothing new and no deletion finished
+    during it (``stats["deleted"]`` is counted by the deleting threads). Only
+    the IDs already handed out are kept in memory.
+    """
+    seen = set()
+    while True:
+        deleted_before = stats["deleted"]
+        new = 0
+        page = 1
+
+        while True:
+            codes = get_qr_code_page(api_key, folder_id, page)
+            if codes is None:
+                return
+            for code in codes:
+                if code.id not in seen:
+                    seen.add(code.id)
+                    new += 1
+                    yield code
+            if len(codes) < PER_PAGE:
+                break
+            page += 1
+
+        if not new and stats["deleted"] == deleted_before:
+            return
+
+class CsvReport:
+    """deleted_qr_codes.csv, written one row per successful deletion."""
+
+    def __init__(self, directory='csv-exports', filename='deleted_qr_codes.csv'):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, filename)
+        self.file = open(self.path, mode='w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=REPORT_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, code):
+        self.writer.writerow(code.to_dict(REPORT_FIELDS))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        print(f"\nCSV report saved as '{self.path}'.")
+
+def delete_qr_code(api_key, code):
+    url = f"{API_BASE}/codes/{code.id}?access-token={api_key}"
+    try:
+        response = client.delete(url)
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to delete QR Code ID {code.id}: {e}")
+        return False
+    if response.status_code == 204:
+        print(f"Deleted QR Code ID: {code.id}")
+        return True
+    if response.status_code == 404:
+        # A retried DELETE whose first attempt already went through.
+        print(f"QR Code ID {code.id} was already deleted")
+        return True
+    print(f"Failed to delete QR Code ID {code.id}: {response.status_code} - {response.text}")
+    return False
+
+def delete_qr_codes(api_key, qr_codes, report=None, stats=None, workers=DELETE_WORKERS):
+    """Delete codes from any iterable, a few at a time. Returns how many were deleted."""
+    stats = stats if stats is not None else {"deleted": 0}
+    lock = threading.Lock()
+
+    def delete(code):
+        if not delete_qr_code(api_key, code):
+            return False
+        # Counted as soon as the DELETE returns, so a listing walk sees deletions finish while it runs.
+        with lock:
+            stats["deleted"] += 1
+        return True
+
+    def settle(code, deleted):
+        if deleted and report:
+            report.write(code)
+
+    bulk.run_bounded(delete, qr_codes, settle, workers)
+    return stats["deleted"]
 
 def main():
     print("QR Code Batch Deletion Tool\n------------------------")
@@ -108,31 +175,62 @@ def main():
     folder_id, folder_name = choose_folder(folders)
     print(f"\nSelected Folder: {folder_name} (ID: {folder_id})")
 
-    # Step 3: Get QR codes
-    qr_codes = get_qr_codes(api_key, folder_id)
-    if not qr_codes:
-        print("No QR codes found.")
-        return
-
-    #Step 4: Confirm deletion
-    print(f"\nYou are about to permanently delete {len(qr_codes)} QR Code(s).")
+    # Step 3: Choose how to delete
+    pipelined = input("Delete while still listing the folder? Faster for large folders, "
+                      "but the total is not shown first. (y/n): ").strip().lower() == 'y'
+
+    if pipelined:
+        size = folder_size(account_data, folder_id)
+        limit = None
+        if size:
+            # One DELETE per code, plus listing pages for about two walks of the folder.
+            count = quota.plan("Delete", size, {api_key: 1 + 2 / PER_PAGE})
+            if not count:
+                print("Operation cancelled. No QR codes were deleted.")
+                return
+            limit = count if count < size else None
+        stop = f" (stopping after {limit})" if limit else ""
+        print(f"\nYou are about to permanently delete every QR Code in {folder_name}{stop}.")
+        qr_codes = None
+    else:
+        qr_codes = get_qr_codes(api_key, folder_id)
+        if not qr_codes:
+            print("No QR codes found.")
+            return
+        qr_codes = qr_codes[:quota.plan("Delete", len(qr_codes), {api_key: 1})]
+        if not qr_codes:
+            print("Operation cancelled. No QR codes were deleted.")
+            return
+        print(f"\nYou are about to permanently delete {len(qr_codes)} QR Code(s).")
+
+    # Step 4: Confirm deletion
     confirm = input("Would you like to proceed? (y/n): ").strip().lower()
     if confirm != 'y':
         print("Operation cancelled. No QR codes were deleted.")
         return
 
-    # Step 5: Delete each QR code
-    deleted_codes = delete_qr_codes(api_key, qr_codes)
-
-    # Step 6: Ask to save report
-    if deleted_codes:
-        choice = input("\nWould you like to save a CSV report of deleted QR codes? (y/n): ").lower()
-        if choice == 'y':
-            write_csv_report(deleted_codes)
-        else:
-            print("No report saved.")
-    else:
+    # Step 5: Ask to save report; rows are written as each deletion succeeds
+    choice = input("\nWould you like to save a CSV report of deleted QR codes? (y/n): ").lower()
+    report = CsvReport() if choice == 'y' else None
+
+    # Step 6: Delete the QR codes
+    stats = {"deleted": 0}
+    if pipelined:
+        qr_codes = iter_qr_codes_while_deleting(api_key, folder_id, stats)
+        if limit:
+            qr_codes = islice(qr_codes, limit)
+
+    try:
+        delete_qr_codes(api_key, qr_codes, report, stats)
+    finally:
+        if report:
+            report.close()
+        concurrency.report()
+
+    if not stats["deleted"]:
         print("No QR codes were deleted.")
+    elif not report:
+        print("No report saved.")
 
     print("\n✅ Process complete.")
 
@@ -1,9 +1,15 @@
+import os
+import sys
 import requests
 from rich.console import Console
 from rich.prompt import Prompt
 from rich.panel import Panel
 from rich.text import Text
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client
+
 console = Console()
 
 
@@ -17,7 +23,7 @@ def main():
     qr_code_id = Prompt.ask("[bold yellow]Enter QR Code ID[/bold yellow]")
     backhalf = Prompt.ask("[bold yellow]Enter desired backhalf[/bold yellow]")
 
-    url = f"https://api.qr-code-generator.com/v1/codes/{qr_code_id}"
+    url = client.v1_url(f"codes/{qr_code_id}")
     params = {"access-token": api_key}
 
     payload = {
@@ -32,7 +38,7 @@ def main():
     console.print("\n[bold cyan]Updating QR Code…[/bold cyan]")
 
     try:
-        response = requests.put(
+        response = client.put(
             url,
             headers=headers,
             params=params,
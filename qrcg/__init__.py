@@ -0,0 +1 @@
+"""Shared helpers for the QR Code Generator automation scripts."""
@@ -0,0 +1,35 @@
+"""Bounded fan-out of one API call per item for the bulk scripts.
+
+Items usually come from a generator (a CSV read lazily, a folder listing),
+so only a couple of calls per worker are queued at a time and the source is
+read just ahead of the work instead of being drained into memory.
+"""
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+QUEUED_PER_WORKER = 2
+
+
+def run_bounded(fn, items, on_done, workers):
+    """Call ``fn(item)`` for every item on ``workers`` threads.
+
+    ``on_done(item, result)`` runs in the calling thread as calls finish, also
+    for calls already sent when the loop is interrupted (e.g. Ctrl+C), so
+    reports written from it stay complete. ``fn`` should return a failure
+    value rather than raise for a request that failed after the client's
+    retries; an exception ends the run once the calls in flight have settled.
+    """
+    in_flight = {}
+
+    def settle(done):
+        for future in done:
+            on_done(in_flight.pop(future), future.result())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in items:
+                in_flight[executor.submit(fn, item)] = item
+                if len(in_flight) >= workers * QUEUED_PER_WORKER:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    settle(done)
+        finally:
+            settle(wait(in_flight)[0])
@@ -0,0 +1,95 @@
+"""Small TTL cache for read-only metadata responses (account, folders).
+
+Entries live in memory and on disk so separate scripts and runs share them.
+Keys combine a hash of the API token with the endpoint and its other query
+parameters; the token itself is never written to disk.
+"""
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+CACHE_DIR = os.environ.get("QRCG_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "qrcg-scripts")
+DEFAULT_TTL = 300
+
+_memory = {}
+# Token hash -> time of the latest create/update/delete made with it in this run.
+_invalidated = {}
+_lock = threading.Lock()
+
+
+def token_hash(api_key):
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(api_key, url, params=None):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != "access-token"]
+    query += [(k, str(v)) for k, v in (params or {}).items() if k != "access-token"]
+    endpoint = f"{parts.netloc}{parts.path}?{urlencode(sorted(query))}"
+    endpoint_hash = hashlib.sha256(endpoint.encode("utf-8")).hexdigest()[:16]
+    return f"{token_hash(api_key)}_{endpoint_hash}"
+
+
+def _path(key):
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def get(key, ttl=DEFAULT_TTL):
+    now = time.time()
+    with _lock:
+        entry = _memory.get(key)
+    if entry is None:
+        try:
+            with open(_path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with _lock:
+            _memory[key] = entry
+
+    if now - entry["ts"] > ttl or entry["ts"] <= _invalidated.get(key.split("_", 1)[0], 0):
+        return None
+    return entry["data"]
+
+
+def put(key, data):
+    entry = {"ts": time.time(), "data": data}
+    with _lock:
+        _memory[key] = entry
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, _path(key))
+    except OSError:
+        # The in-memory copy is still good for this run.
+        pass
+
+
+def invalidate(api_key):
+    """Drop the token's cached entries; called after every successful mutating request.
+
+    Only the first call per token in a run touches the cache directory. After
+    that, entries cached before the latest call are ignored on read instead.
+    """
+    token = token_hash(api_key)
+    with _lock:
+        first = token not in _invalidated
+        _invalidated[token] = time.time()
+    if not first:
+        return
+
+    prefix = f"{token}_"
+    with _lock:
+        for key in [key for key in _memory if key.startswith(prefix)]:
+            del _memory[key]
+    for path in glob.glob(os.path.join(CACHE_DIR, f"{prefix}*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
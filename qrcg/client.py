@@ -0,0 +1,205 @@
+"""Pooled HTTP client shared by every script.
+
+All API traffic goes through one keep-alive ``requests.Session`` so repeated
+calls reuse the same TCP/TLS connection instead of opening a new one each time.
+Requests carrying an API key are paced by that key's token bucket and gated
+by its adaptive concurrency limit, and transient failures are retried
+according to ``qrcg.retry``.
+"""
+import json
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from qrcg import cache, concurrency, ratelimit, retry
+
+# Overridable so every script can be pointed at a local stand-in such as bench/mock_api.py.
+V1_BASE = os.environ.get("QRCG_V1_BASE") or "https://api.qr-code-generator.com/v1"
+V3_BASE = os.environ.get("QRCG_V3_BASE") or "https://api.qrcg.com/v3"
+
+# (connect, read) seconds
+TIMEOUT = (5, 60)
+POOL_SIZE = 16
+
+MUTATING_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+_session = None
+
+
+def get_session():
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _session = session
+    return _session
+
+
+def v1_url(path):
+    return f"{V1_BASE}/{path.lstrip('/')}"
+
+
+def v3_url(path):
+    return f"{V3_BASE}/{path.lstrip('/')}"
+
+
+def get_api_key(url, kwargs):
+    params = kwargs.get("params") or {}
+    if "access-token" in params:
+        return params["access-token"]
+
+    query = parse_qs(urlsplit(url).query)
+    if "access-token" in query:
+        return query["access-token"][0]
+
+    auth = (kwargs.get("headers") or {}).get("Authorization", "")
+    if auth.startswith("Key "):
+        return auth[4:]
+    return None
+
+
+def get_token_info(api_key):
+    """Return the ``/v1/access-tokens`` entry for ``api_key``, or None if unavailable."""
+    try:
+        response = request("GET", v1_url("access-tokens"), params={"access-token": api_key}, throttle=False)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+    tokens = data.get("items", data) if isinstance(data, dict) else data
+    if not isinstance(tokens, list) or not tokens:
+        return None
+
+    for token_info in tokens:
+        if token_info.get("token") == api_key:
+            return token_info
+    return tokens[0]
+
+
+def get_rate_limit(api_key):
+    token_info = get_token_info(api_key)
+    if not token_info:
+        print(f"⚠️  Could not read rate_limit for this token, assuming {ratelimit.DEFAULT_RATE}/s")
+        return None
+    try:
+        return float(token_info.get("rate_limit"))
+    except (TypeError, ValueError):
+        return None
+
+
+def request(method, url, throttle=True, retries=retry.MAX_ATTEMPTS - 1, **kwargs):
+    kwargs.setdefault("timeout", TIMEOUT)
+    api_key = get_api_key(url, kwargs)
+    limiter = gate = None
+    if throttle and api_key:
+        limiter = ratelimit.get_limiter(api_key, lambda: get_rate_limit(api_key))
+        gate = concurrency.get_controller(api_key, url)
+
+    attempt = 0
+    while True:
+        response = error = None
+        if gate:
+            gate.acquire()
+        try:
+            if limiter:
+                limiter.acquire()
+            started = time.monotonic()
+            response = get_session().request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            error = e
+        finally:
+            if gate:
+                gate.release(time.monotonic() - started if response is not None else None,
+                             response.status_code if response is not None else None,
+                             error=response is None)
+
+        if error is not None:
+            if attempt >= retries or not retry.should_retry(method, error=error) or not retry.budget.take():
+                raise error
+            attempt += 1
+            delay = retry.delay_for(attempt)
+            print(f"↻ {method.upper()} {urlsplit(url).path} failed ({type(error).__name__}), "
+                  f"retry {attempt}/{retries} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        if attempt >= retries or not retry.should_retry(method, response=response) or not retry.budget.take():
+            break
+
+        attempt += 1
+        delay = retry.delay_for(attempt, response)
+        print(f"↻ {method.upper()} {urlsplit(url).path} returned {response.status_code}, "
+              f"retry {attempt}/{retries} in {delay:.1f}s")
+        response.close()
+        if response.status_code == 429 and limiter:
+            # Everyone sharing this token backs off, not just this thread.
+            limiter.pause(delay)
+        else:
+            time.sleep(delay)
+
+    if method.upper() in MUTATING_METHODS and response.status_code < 300 and api_key:
+        cache.invalidate(api_key)
+    return response
+
+
+class CachedResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+    @property
+    def text(self):
+        return json.dumps(self.data)
+
+
+def get_cached(url, ttl=cache.DEFAULT_TTL, **kwargs):
+    """GET a JSON metadata endpoint, served from the shared TTL cache when fresh.
+
+    Any successful POST/PUT/PATCH/DELETE made with the same token drops that
+    token's cached entries.
+    """
+    api_key = get_api_key(url, kwargs)
+    key = cache.make_key(api_key, url, kwargs.get("params"))
+
+    data = cache.get(key, ttl)
+    if data is not None:
+        return CachedResponse(data)
+
+    response = get(url, **kwargs)
+    if response.status_code == 200:
+        try:
+            cache.put(key, response.json())
+        except ValueError:
+            pass
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
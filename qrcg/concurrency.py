@@ -0,0 +1,137 @@
+"""Adaptive (AIMD) limit on requests in flight, per token and endpoint.
+
+``qrcg.client`` takes a slot before every paced request and reports back how
+it went. While responses come back quickly and successfully the limit grows
+by one slot per round trip; a 429, a 5xx, a connection error or latency well
+above the best seen halves it, at most once per round trip. Bulk operations
+run ``MAX_LIMIT`` worker threads and let the controller decide how many of
+them are actually talking to the API.
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+from qrcg import cache
+
+INITIAL_LIMIT = 4
+MIN_LIMIT = 1
+MAX_LIMIT = 16
+DECREASE = 0.5
+# Latency this many times the best recent latency counts as congestion.
+LATENCY_TOLERANCE = 3.0
+# The best-latency baseline creeps up by this fraction per sample so it can follow a slower API.
+BASELINE_DRIFT = 0.01
+EWMA_WEIGHT = 0.2
+
+_controllers = {}
+_lock = threading.Lock()
+
+
+class AdaptiveLimit:
+    def __init__(self, name, initial=INITIAL_LIMIT, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self.last_cut = 0.0
+        self.completed = 0
+        self.cuts = 0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, status=None, error=False):
+        """Free a slot and adjust the limit from how the request went."""
+        with self.cond:
+            self.in_flight -= 1
+            self.completed += 1
+
+            congested = error or status == 429 or (status is not None and status >= 500)
+            if congested:
+                self._decrease("429" if status == 429 else "errors")
+                self.cond.notify_all()
+                return
+
+            # Only successful responses say anything about latency; rejections come back fast.
+            if latency is not None:
+                self.latency = latency if self.latency is None else (
+                    EWMA_WEIGHT * latency + (1 - EWMA_WEIGHT) * self.latency)
+                self.baseline = latency if self.baseline is None else min(
+                    latency, self.baseline * (1 + BASELINE_DRIFT))
+
+            if self.latency is not None and self.latency > self.baseline * LATENCY_TOLERANCE:
+                self._decrease("latency")
+            else:
+                # +1 slot per full window of successful requests.
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            self.cond.notify_all()
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        # Responses already in flight saw the same congestion, so cut once per round trip.
+        if self.limit <= self.min_limit or now - self.last_cut < (self.latency or self.baseline or 0):
+            return
+        old = int(self.limit)
+        self.limit = max(self.min_limit, self.limit * DECREASE)
+        self.last_cut = now
+        self.cuts += 1
+        # Re-measure from scratch at the new level.
+        self.latency = None
+        if int(self.limit) != old:
+            print(f"⇣ {self.name}: {old} → {int(self.limit)} requests in flight ({reason})")
+
+    def state(self):
+        with self.cond:
+            return {
+                "name": self.name,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency": self.latency,
+                "baseline": self.baseline,
+                "completed": self.completed,
+                "cuts": self.cuts,
+            }
+
+    def __str__(self):
+        state = self.state()
+        latency = f"{state['latency'] * 1000:.0f}ms" if state["latency"] is not None else "n/a"
+        return (f"{state['name']}: limit {state['limit']}, {state['in_flight']} in flight, "
+                f"latency {latency}, {state['completed']} done, {state['cuts']} cut(s)")
+
+
+def resource_for(url):
+    """``/v1/codes/123`` -> ``codes``, ``/v3/qrcodes/9`` -> ``qrcodes``."""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if len(parts) > 1 and parts[0] in ("v1", "v3"):
+        return parts[1]
+    return parts[0] if parts else ""
+
+
+def get_controller(api_key, url):
+    """Return the controller for this token and endpoint, creating it on first use."""
+    resource = resource_for(url)
+    key = (api_key, resource)
+    with _lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = AdaptiveLimit(f"/{resource} (token {cache.token_hash(api_key)[:6]})")
+        return controller
+
+
+def controllers():
+    with _lock:
+        return list(_controllers.values())
+
+
+def report():
+    for controller in controllers():
+        if controller.completed:
+            print(f"⚙️  {controller}")
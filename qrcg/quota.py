@@ -0,0 +1,86 @@
+"""Pre-flight check of a job's API calls against the monthly quota.
+
+Each script estimates the calls a run needs from metadata it already has
+(code counts, pages, date windows) and asks ``plan`` before starting. When
+the job does not fit in what is left of a token's month, the run is either
+cancelled or cut down to the units that fit, with a batch schedule for the
+rest so a half-finished job never hits the cap in the middle.
+"""
+import math
+from datetime import date
+
+from qrcg import client
+
+# Calls kept back for retries, lookups and anything else running on the token.
+RESERVE_FRACTION = 0.02
+MIN_RESERVE = 25
+
+
+def remaining_calls(api_key):
+    """Calls left this month for ``api_key``, or None if the token does not say."""
+    token_info = client.get_token_info(api_key)
+    if not token_info:
+        return None
+    try:
+        return int(token_info.get("rate_number_month"))
+    except (TypeError, ValueError):
+        return None
+
+
+def next_reset(today=None):
+    today = today or date.today()
+    return date(today.year + today.month // 12, today.month % 12 + 1, 1)
+
+
+def usable(remaining):
+    return max(0, remaining - max(MIN_RESERVE, int(remaining * RESERVE_FRACTION)))
+
+
+def plan(label, units, per_unit, fixed=None, unit_name="codes", allow_shrink=True, ask=None):
+    """Return how many of ``units`` to run now: all of them, a prefix that fits the quota, or 0.
+
+    ``per_unit`` and ``fixed`` map each API key the job uses to the calls it
+    makes per unit and once per run.
+    """
+    fixed = fixed or {}
+    ask = ask or input
+    if not units:
+        return units
+
+    keys = list(per_unit)
+    affordable = units
+    unknown = False
+
+    print(f"\n📐 {label}: {units} {unit_name}")
+    for n, api_key in enumerate(keys, start=1):
+        needed = math.ceil(units * per_unit[api_key] + fixed.get(api_key, 0))
+        remaining = remaining_calls(api_key)
+        who = f"token {n}" if len(keys) > 1 else "token"
+
+        if remaining is None:
+            unknown = True
+            print(f"   ~{needed} API calls on {who}, monthly quota unknown")
+            continue
+
+        print(f"   ~{needed} API calls on {who}, {remaining} left this month")
+        if per_unit[api_key]:
+            fits = (usable(remaining) - fixed.get(api_key, 0)) / per_unit[api_key]
+            affordable = min(affordable, max(0, math.floor(fits)))
+
+    if affordable >= units:
+        if unknown:
+            print("⚠️  Could not read the monthly quota, starting without a quota check")
+        return units
+
+    print(f"⛔ Only about {affordable} of {units} {unit_name} fit in this month's remaining quota.")
+
+    if not allow_shrink or not affordable:
+        answer = ask("Start anyway and risk hitting the monthly cap mid-run? (y/n): ").strip().lower()
+        return units if answer == "y" else 0
+
+    batches = math.ceil(units / affordable)
+    reset = next_reset()
+    print(f"   Spread over {batches} monthly batch(es): {affordable} now, the rest from {reset.isoformat()} on "
+          f"(assuming a similar quota each month).")
+    answer = ask(f"Run the first {affordable} {unit_name} now and leave the rest for later? (y/n): ").strip().lower()
+    return affordable if answer == "y" else 0
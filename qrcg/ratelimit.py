@@ -0,0 +1,56 @@
+"""Token-bucket rate limiting keyed by API token.
+
+Each API key gets one bucket refilled at the token's own ``rate_limit``
+(requests per second, as reported by ``/v1/access-tokens``), so every
+request made through ``qrcg.client`` is paced to what the account allows.
+"""
+import threading
+import time
+
+DEFAULT_RATE = 10
+# Stay just under the advertised limit to absorb clock jitter on the server.
+HEADROOM = 0.95
+
+_limiters = {}
+_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hold every caller of this bucket for ``seconds``, e.g. after a 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        return
+                    wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_limiter(api_key, rate_lookup):
+    """Return the bucket for ``api_key``, creating it from ``rate_lookup()`` on first use."""
+    with _lock:
+        limiter = _limiters.get(api_key)
+        if limiter is None:
+            rate = rate_lookup() or DEFAULT_RATE
+            limiter = TokenBucket(max(rate * HEADROOM, 0.1))
+            _limiters[api_key] = limiter
+        return limiter
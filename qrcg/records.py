@@ -0,0 +1,86 @@
+"""Compact QR Code record shared by the scripts.
+
+One slotted object per code instead of a dict, built straight from an API
+response item or a CSV row. Every script that needs a code's domain id for a
+short URL gets it from ``domain_id_for``.
+"""
+
+# Short URL prefix -> domain_id expected by PUT /codes/{id}
+DOMAIN_IDS = (
+    ("http://q-r.to/", 1),
+    ("http://l.ead.me/", 2),
+    ("https://l.ead.me/", 3),
+    ("https://qrco.de/", 4),
+)
+DEFAULT_DOMAIN_ID = 4
+
+FIELDS = (
+    "id", "type_id", "type_name", "title", "short_code", "short_url", "target_url",
+    "created", "status", "total_scans", "unique_scans", "folder_id",
+)
+INT_FIELDS = frozenset(("id", "type_id", "total_scans", "unique_scans", "folder_id"))
+
+
+def domain_id_for(short_url):
+    for prefix, domain_id in DOMAIN_IDS:
+        if short_url and short_url.startswith(prefix):
+            return domain_id
+    return DEFAULT_DOMAIN_ID
+
+
+def parse_int(value):
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class QRCode:
+    __slots__ = FIELDS + ("_domain_id",)
+
+    def __init__(self, id=None, type_id=None, type_name=None, title=None, short_code=None, short_url=None,
+                 target_url=None, created=None, status=None, total_scans=None, unique_scans=None,
+                 folder_id=None, domain_id=None):
+        self.id = id
+        self.type_id = type_id
+        self.type_name = type_name
+        self.title = title
+        self.short_code = short_code
+        self.short_url = short_url
+        self.target_url = target_url
+        self.created = created
+        self.status = status
+        self.total_scans = total_scans
+        self.unique_scans = unique_scans
+        self.folder_id = folder_id
+        self._domain_id = domain_id
+
+    @classmethod
+    def from_api(cls, data):
+        get = data.get
+        return cls(*[get(field) for field in FIELDS])
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a CSV row (or any mapping of strings), converting the numeric fields."""
+        get = row.get
+        values = [parse_int(get(field)) if field in INT_FIELDS else get(field) for field in FIELDS]
+        return cls(*values, domain_id=parse_int(get("domain_id")))
+
+    @property
+    def domain_id(self):
+        if self._domain_id is None:
+            return domain_id_for(self.short_url)
+        return self._domain_id
+
+    @property
+    def is_dynamic(self):
+        return bool(self.short_url)
+
+    def to_dict(self, fields=FIELDS):
+        return {field: getattr(self, field) for field in fields}
+
+    def __repr__(self):
+        return f"QRCode(id={self.id!r}, title={self.title!r}, short_url={self.short_url!r})"
@@ -0,0 +1,99 @@
+"""Retry policy shared by every request made through ``qrcg.client``.
+
+429, 5xx and connection errors are retried with exponential backoff and full
+jitter. A ``Retry-After`` (or rate-limit reset) header from the server always
+wins over the computed delay. All retries in a process draw from one budget,
+so a run against an API that is actually down fails instead of backing off
+for hours.
+"""
+import email.utils
+import os
+import random
+import threading
+import time
+
+import requests
+
+RETRYABLE_STATUS = frozenset((429, 500, 502, 503, 504))
+MAX_ATTEMPTS = 5
+BASE_DELAY = 0.5
+MAX_DELAY = 60.0
+RETRY_BUDGET = int(os.environ.get("QRCG_RETRY_BUDGET") or 500)
+
+# A POST that reached the server may have created something, so it is only
+# replayed when the server clearly refused it (429) or the connection never opened.
+NOT_REPLAYABLE = ("POST",)
+
+RESET_HEADERS = ("X-RateLimit-Reset", "RateLimit-Reset")
+
+
+class RetryBudget:
+    def __init__(self, retries):
+        self.remaining = retries
+        self.lock = threading.Lock()
+        self.warned = False
+
+    def take(self):
+        with self.lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return True
+            if not self.warned:
+                self.warned = True
+                print("⚠️  Retry budget for this run is used up, failures are no longer retried "
+                      "(set QRCG_RETRY_BUDGET to raise it)")
+            return False
+
+
+budget = RetryBudget(RETRY_BUDGET)
+
+
+def backoff(attempt):
+    """Full-jitter delay before retry number ``attempt`` (1-based)."""
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+
+def server_delay(response):
+    """Seconds the server asked us to wait, or None."""
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    for header in RESET_HEADERS:
+        value = response.headers.get(header)
+        if not value:
+            continue
+        try:
+            reset = float(value)
+        except ValueError:
+            continue
+        # Either seconds from now or an epoch timestamp.
+        return max(0.0, reset - time.time()) if reset > 1e9 else reset
+
+    return None
+
+
+def should_retry(method, response=None, error=None):
+    replayable = method.upper() not in NOT_REPLAYABLE
+
+    if error is not None:
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        return replayable and isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+    if response.status_code == 429:
+        return True
+    return replayable and response.status_code in RETRYABLE_STATUS
+
+
+def delay_for(attempt, response=None):
+    delay = server_delay(response) if response is not None else None
+    if delay is None:
+        delay = backoff(attempt)
+    return min(delay, MAX_DELAY)
@@ -1,11 +1,19 @@
 import csv
-import requests
 import json
-import time
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client, concurrency
+from qrcg.records import QRCode
+from journal import CREATED
+
+CREATE_WORKERS = concurrency.MAX_LIMIT
 
 def create_qr_code_in_account_b(api_key_b, title, target_url, type_id=1):
-    url = "https://api.qr-code-generator.com/v1/codes?access-token=" + api_key_b
+    url = client.v1_url("codes?access-token=" + api_key_b)
     headers = {"Content-Type": "application/json"}
     payload = {
         "typeId": type_id,
@@ -13,7 +21,7 @@ def create_qr_code_in_account_b(api_key_b, title, target_url, type_id=1):
         "data": {"url": target_url}
     }
 
-    response = requests.post(url, headers=headers, data=json.dumps(payload))
+    response = client.post(url, headers=headers, data=json.dumps(payload))
 
     if response.status_code == 200:
         data = response.json()
@@ -29,7 +37,7 @@ def create_qr_code_in_account_b(api_key_b, title, target_url, type_id=1):
 def load_csv_data(file_path):
     with open(file_path, mode='r', encoding='utf-8') as csvfile:
         reader = csv.DictReader(csvfile)
-        data = [row for row in reader]
+        data = [QRCode.from_row(row) for row in reader]
 
     return data
 
@@ -40,6 +48,8 @@ def save_mapping_to_csv(mapping, file_path="csv-exports/qr_code_mapping.csv"):
         return
 
     fieldnames = ['ID_A', 'ID_B']
+    if any('DOWNTIME_S' in row for row in mapping):
+        fieldnames.append('DOWNTIME_S')
     with open(file_path, mode='w', newline='', encoding='utf-8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
@@ -48,25 +58,35 @@ def save_mapping_to_csv(mapping, file_path="csv-exports/qr_code_mapping.csv"):
     print(f"Mapping data has been saved to {file_path}")
 
 
-def create_qr_codes_in_account_b_from_csv(csv_file_path, api_key_b):
-    qr_codes_data = load_csv_data(csv_file_path)
-
-    id_mapping = []
+def create_qr_codes_in_account_b(api_key_b, qr_codes_data, journal=None, workers=CREATE_WORKERS):
+    def create(qr_code):
+        id_a = qr_code.id
+        title = qr_code.title
+        target_url = qr_code.target_url
 
-    for qr_code in qr_codes_data:
-        id_a = qr_code['id']
-        title = qr_code['title']
-        target_url = qr_code['target_url']
+        if journal and journal.done(id_a, CREATED):
+            return {'ID_A': id_a, 'ID_B': journal.get(id_a, CREATED)}
 
         id_b = create_qr_code_in_account_b(api_key_b, title, target_url)
 
         if id_b:
+            if journal:
+                journal.record(id_a, CREATED, id_b)
             print(f"Mapping ID_A: {id_a} to ID_B: {id_b}")
-            id_mapping.append({'ID_A': id_a, 'ID_B': id_b})
+            return {'ID_A': id_a, 'ID_B': id_b}
+        return None
+
+    # The adaptive limit in qrcg.concurrency decides how many creates are really in flight.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        id_mapping = [mapping for mapping in executor.map(create, qr_codes_data) if mapping]
+
+    return id_mapping
+
+
+def create_qr_codes_in_account_b_from_csv(csv_file_path, api_key_b):
+    qr_codes_data = load_csv_data(csv_file_path)
 
-        if len(id_mapping) % 10 == 0:
-            print("Rate limit reached, waiting for 1 second...")
-            time.sleep(1)
+    id_mapping = create_qr_codes_in_account_b(api_key_b, qr_codes_data)
 
     save_mapping_to_csv(id_mapping)
 
@@ -1,8 +1,12 @@
 import csv
-import requests
-import time
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client
+from journal import DELETED
+
 def load_mapping_from_csv(file_path="csv-exports/qr_code_mapping.csv"):
     mappings = []
     with open(file_path, mode='r', encoding='utf-8') as csvfile:
@@ -12,45 +16,39 @@ def load_mapping_from_csv(file_path="csv-exports/qr_code_mapping.csv"):
     return mappings
 
 def delete_qr_code_in_account_a(api_key_a, id_a):
-    url = f"https://api.qr-code-generator.com/v1/codes/{id_a}?access-token={api_key_a}"
-    response = requests.delete(url)
+    url = client.v1_url(f"codes/{id_a}?access-token={api_key_a}")
+    response = client.delete(url)
 
     if response.status_code == 200 or response.status_code == 204:
         print(f"Successfully deleted QR code with ID_A: {id_a}")
         return True
+    elif response.status_code == 404:
+        # A retried DELETE whose first attempt already went through; the short URL is free either way.
+        print(f"QR code with ID_A: {id_a} was already deleted")
+        return True
     else:
         print(f"Error: Unable to delete QR code with ID_A: {id_a}. Status code: {response.status_code}")
         return False
 
-def delete_qr_codes_from_account_a(api_key_a, mapping_file="csv-exports/qr_code_mapping.csv"):
-    mappings = load_mapping_from_csv(mapping_file)
-
-    call_counter = 0
-    start_time = time.time()
-
+def delete_qr_codes_in_account_a(api_key_a, mappings, journal=None):
     for mapping in mappings:
         id_a = mapping.get('ID_A')
 
         if id_a:
-            success = delete_qr_code_in_account_a(api_key_a, id_a)
+            if journal and journal.done(id_a, DELETED):
+                continue
 
-            if not success:
-                print(f"Failed to delete QR code with ID_A: {id_a}. Retrying after 1 second...")
-                time.sleep(1)
+            # Transient errors were already retried by the client; this one is final.
+            if delete_qr_code_in_account_a(api_key_a, id_a) and journal:
+                journal.record(id_a, DELETED)
 
-            call_counter += 1
+    print("Deletion process completed.")
 
-            if call_counter >= 10:
-                elapsed_time = time.time() - start_time
-                if elapsed_time < 1:
-                    sleep_time = 1 - elapsed_time
-                    print(f"Rate limit reached, sleeping for {sleep_time:.2f} seconds...")
-                    time.sleep(sleep_time)
 
-                call_counter = 0
-                start_time = time.time()
+def delete_qr_codes_from_account_a(api_key_a, mapping_file="csv-exports/qr_code_mapping.csv"):
+    mappings = load_mapping_from_csv(mapping_file)
 
-    print("Deletion process completed.")
+    delete_qr_codes_in_account_a(api_key_a, mappings)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -1,59 +1,95 @@
 import csv
 import json
+import os
 import sys
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-API_BASE = "https://api.qrcg.com/v3/qrcodes"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-def main():
-    if len(sys.argv) != 2:
-        print("Error: API key required")
-        sys.exit(1)
+from qrcg import client, concurrency
+from qrcg.records import QRCode
+from journal import DESIGN
 
-    api_key = sys.argv[1]
-    input_csv = Path("csv-exports/qr_codes.csv")
-    output_file = Path("csv-exports/qr_code_designs.json")
+API_BASE = client.v3_url("qrcodes")
+DESIGN_WORKERS = concurrency.MAX_LIMIT
 
-    if not input_csv.exists():
-        print("Error: qr_codes.csv not found")
-        sys.exit(1)
 
-    headers = {
+def get_headers(api_key):
+    return {
         "Authorization": f"Key {api_key}",
         "Accept": "application/json",
         "Content-Type": "application/json"
     }
 
+
+def get_design(api_key, qr_id):
+    response = client.get(f"{API_BASE}/{qr_id}", headers=get_headers(api_key))
+    if response.status_code != 200:
+        print(f"Warning: Failed to fetch design for QR {qr_id}")
+        return None
+
+    data = response.json()
+
+    return {
+        "customizations": data.get("customizations"),
+        "title": data.get("title"),
+        "url": data.get("url"),
+        "status": data.get("status")
+    }
+
+
+def get_designs(api_key, qr_codes, journal=None, workers=DESIGN_WORKERS):
     designs = {}
 
-    with input_csv.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            qr_id = row.get("id")
-            if not qr_id:
-                continue
+    def fetch(qr_code):
+        qr_id = qr_code.id
+        if not qr_id:
+            return
+
+        if journal and journal.done(qr_id, DESIGN):
+            designs[str(qr_id)] = journal.get(qr_id, DESIGN)
+            return
 
-            response = requests.get(f"{API_BASE}/{qr_id}", headers=headers)
-            if response.status_code != 200:
-                print(f"Warning: Failed to fetch design for QR {qr_id}")
-                continue
+        design = get_design(api_key, qr_id)
+        if design is None:
+            return
 
-            data = response.json()
+        designs[str(qr_id)] = design
+        if journal:
+            journal.record(qr_id, DESIGN, design)
+        print(f"✔ Retrieved design for QR {qr_id}")
 
-            designs[qr_id] = {
-                "customizations": data.get("customizations"),
-                "title": data.get("title"),
-                "url": data.get("url"),
-                "status": data.get("status")
-            }
+    # The adaptive limit in qrcg.concurrency decides how many fetches are really in flight.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(fetch, qr_codes))
 
-            print(f"✔ Retrieved design for QR {qr_id}")
+    return designs
 
+
+def save_designs(designs, output_file=Path("csv-exports/qr_code_designs.json")):
     output_file.parent.mkdir(parents=True, exist_ok=True)
     output_file.write_text(json.dumps(designs, indent=2))
 
     print(f"Saved {len(designs)} designs → {output_file}")
 
+
+def main():
+    if len(sys.argv) != 2:
+        print("Error: API key required")
+        sys.exit(1)
+
+    api_key = sys.argv[1]
+    input_csv = Path("csv-exports/qr_codes.csv")
+
+    if not input_csv.exists():
+        print("Error: qr_codes.csv not found")
+        sys.exit(1)
+
+    with input_csv.open(newline="", encoding="utf-8") as f:
+        designs = get_designs(api_key, [QRCode.from_row(row) for row in csv.DictReader(f)])
+
+    save_designs(designs)
+
 if __name__ == "__main__":
     main()
@@ -1,10 +1,14 @@
-import requests
+import os
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client
+
 def get_folder_id(api_key_a):
-    url = f"http://api.qr-code-generator.com/v1/account?access-token={api_key_a}&expand=folders,statistics"
+    url = client.v1_url(f"account?access-token={api_key_a}&expand=folders,statistics")
 
-    response = requests.get(url)
+    response = client.get_cached(url)
 
     if response.status_code == 200:
         data = response.json()
@@ -1,4 +1,3 @@
-import requests
 import csv
 import os
 import sys
@@ -7,6 +6,11 @@ import time
 import traceback
 from rich.console import Console
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client
+from qrcg.records import QRCode
+
 console = Console()
 
 PER_PAGE = 100
@@ -25,10 +29,10 @@ def debug(msg, level="INFO"):
 def get_total_qr_codes(api_key):
     debug("Fetching total QR code count")
 
-    url = f"https://api.qr-code-generator.com/v1/account?access-token={api_key}"
+    url = client.v1_url(f"account?access-token={api_key}")
 
     try:
-        response = requests.get(url)
+        response = client.get_cached(url)
         debug(f"Account endpoint status: {response.status_code}")
 
         if response.status_code != 200:
@@ -60,57 +64,69 @@ def get_qr_codes(api_key, folder_id):
     total = get_total_qr_codes(api_key)
     if total is None:
         console.print("[bold red]Error: Unable to fetch total QR count[/bold red]")
-        sys.exit(1)
+        return None
 
-    total_pages = math.ceil(total / PER_PAGE)
-    debug(f"Total pages to fetch: {total_pages}")
+    # The account-wide count only caps the walk; the folder itself is usually far
+    # smaller, so stop as soon as a page comes back short.
+    max_pages = math.ceil(total / PER_PAGE)
+    debug(f"Fetching folder pages (at most {max_pages})")
 
-    for page in range(1, total_pages + 1):
+    failed = False
+    for page in range(1, max_pages + 1):
         url = (
-            f"http://api.qr-code-generator.com/v1/codes"
+            f"{client.V1_BASE}/codes"
             f"?access-token={api_key}"
             f"&per-page={PER_PAGE}"
             f"&page={page}"
             f"&folder_id={folder_id}"
         )
 
-        debug(f"Fetching page {page}/{total_pages}")
+        debug(f"Fetching page {page}")
 
+        # The client has already retried transient failures, so a failed page stops the walk
+        # rather than silently leaving its codes out of the rebuild.
+        failed = True
         try:
             start_time = time.time()
-            response = requests.get(url)
+            response = client.get(url)
             elapsed = time.time() - start_time
 
             debug(f"Response {page}: {response.status_code} ({elapsed:.2f}s)")
 
             if response.status_code != 200:
                 debug(f"Failed page {page}: {response.text}", "ERROR")
-                continue
+                break
 
             try:
                 data = response.json()
             except Exception as json_err:
                 debug(f"JSON parse failed on page {page}: {json_err}", "ERROR")
-                continue
+                break
+
+            failed = False
 
-            if isinstance(data, list):
-                if not data:
-                    debug(f"Empty page {page}", "WARNING")
-                    continue
+            if not isinstance(data, list) or not data:
+                debug(f"Empty page {page}, end of folder")
+                break
 
-                qr_codes.extend(data)
+            qr_codes.extend(data)
 
-            # Avoid rate limit:
-            time.sleep(0.11)
+            if len(data) < PER_PAGE:
+                debug(f"Short page {page} ({len(data)} codes), end of folder")
+                break
 
         except Exception as e:
             debug(f"Request failed on page {page}: {e}", "CRITICAL")
             traceback.print_exc()
-            continue
+            break
+
+    if failed:
+        console.print(f"[bold red]Error: Page {page} could not be fetched, not rebuilding a partial folder[/bold red]")
+        return None
 
     if not qr_codes:
         console.print("[bold red]Error: No QR Codes Found[/bold red]")
-        sys.exit(1)
+        return None
 
     debug(f"Total QR codes fetched (filtered by folder): {len(qr_codes)}")
 
@@ -121,36 +137,7 @@ def get_qr_codes(api_key, folder_id):
 # PROCESS QR CODES
 # -------------------------
 def process_qr_codes(qr_codes):
-    processed_data = []
-
-    for qr in qr_codes:
-        qr_info = {
-            'id': qr.get('id'),
-            'type_id': qr.get('type_id'),
-            'type_name': qr.get('type_name'),
-            'title': qr.get('title'),
-            'short_code': qr.get('short_code'),
-            'short_url': qr.get('short_url'),
-            'domain_id': get_domain_id(qr.get('short_url')),
-            'target_url': qr.get('target_url'),
-        }
-
-        processed_data.append(qr_info)
-
-    processed_data.reverse()
-    return processed_data
-
-
-def get_domain_id(short_url):
-    if short_url.startswith("http://q-r.to/"):
-        return 1
-    elif short_url.startswith("http://l.ead.me/"):
-        return 2
-    elif short_url.startswith("https://l.ead.me/"):
-        return 3
-    elif short_url.startswith("https://qrco.de/"):
-        return 4
-    return 4
+    return [QRCode.from_api(qr) for qr in qr_codes]
 
 
 # -------------------------
@@ -160,8 +147,6 @@ def save_to_csv(data, folder="csv-exports", filename="qr_codes.csv"):
     if not os.path.exists(folder):
         os.makedirs(folder)
 
-    data.reverse()
-
     filepath = os.path.join(folder, filename)
 
     fieldnames = ['id', 'type_id', 'type_name', 'title', 'domain_id', 'short_code', 'short_url', 'target_url']
@@ -169,7 +154,7 @@ def save_to_csv(data, folder="csv-exports", filename="qr_codes.csv"):
     with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
-        writer.writerows(data)
+        writer.writerows(qr.to_dict(fieldnames) for qr in data)
 
     print(f"Data has been saved to {filepath}")
 
@@ -186,6 +171,8 @@ if __name__ == "__main__":
         FOLDER_ID = input("Please enter the REBUILDS FOLDER_ID: ")
 
     qr_codes = get_qr_codes(API_KEY_A, FOLDER_ID)
+    if not qr_codes:
+        sys.exit(1)
 
     processed_data = process_qr_codes(qr_codes)
 
@@ -0,0 +1,120 @@
+"""Append-only progress journal for the rebuild.
+
+Every finished step for a code is appended to a JSONL file as it happens, so a
+crashed run can be picked up again with ``--resume`` without recreating codes
+that already exist in ACCOUNT_B or repeating any other API call.
+
+Lines are flushed to the OS immediately (surviving a process crash) and
+fsync'd in batches (surviving a machine crash with at most a few lines lost).
+"""
+import json
+import os
+import threading
+import time
+
+JOURNAL_FILE = "csv-exports/rebuild_journal.jsonl"
+SYNC_EVERY = 25
+SYNC_INTERVAL = 1.0
+
+# Steps, in the order a code passes through them
+DESIGN = "design"
+CREATED = "created"
+DELETED = "deleted"
+SHORT_URL = "short_url"
+DESIGN_APPLIED = "design_applied"
+
+
+def load_journal(path=JOURNAL_FILE):
+    state = {}
+    if not os.path.exists(path):
+        return state
+
+    with open(path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn last line from a crash mid-write
+                continue
+            state.setdefault(str(entry["id_a"]), {})[entry["step"]] = entry.get("value", True)
+
+    return state
+
+
+def drop_torn_line(path=JOURNAL_FILE):
+    """Cut a torn last line off the journal so the next record starts on a line of its own."""
+    if not os.path.exists(path):
+        return
+    with open(path, mode='rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if not end:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the end of the last complete line.
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(pos - step + newline + 1)
+                return
+            pos -= step
+        f.truncate(0)
+
+
+def has_entries(path=JOURNAL_FILE):
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def archive(path=JOURNAL_FILE):
+    """Move an earlier journal aside instead of overwriting it; returns the new path."""
+    root, ext = os.path.splitext(path)
+    archived = f"{root}_{time.strftime('%Y%m%d_%H%M%S')}{ext}"
+    os.replace(path, archived)
+    return archived
+
+
+class Journal:
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        self.path = path
+        self.state = load_journal(path) if resume else {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if resume:
+            drop_torn_line(path)
+        self.file = open(path, mode='a' if resume else 'w', encoding='utf-8')
+
+    def done(self, id_a, step):
+        return step in self.state.get(str(id_a), {})
+
+    def get(self, id_a, step):
+        return self.state.get(str(id_a), {}).get(step)
+
+    def record(self, id_a, step, value=True):
+        entry = {"id_a": str(id_a), "step": step, "value": value, "ts": round(time.time(), 3)}
+        with self.lock:
+            self.state.setdefault(str(id_a), {})[step] = value
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+            self.pending += 1
+            if self.pending >= SYNC_EVERY or time.monotonic() - self.last_sync >= SYNC_INTERVAL:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
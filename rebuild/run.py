@@ -1,7 +1,23 @@
-import subprocess
+import argparse
+from collections import defaultdict
+import os
 import sys
 from rich.console import Console
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import concurrency, quota
+import get_folder_id as folder_step
+import get_qr_codes as qr_codes_step
+import get_designs as designs_step
+import create_qr_codes as create_step
+import delete_qr_codes as delete_step
+import update_short_urls as short_urls_step
+import update_designs as update_designs_step
+import streaming
+import journal as journal_step
+from journal import Journal, JOURNAL_FILE, DESIGN, CREATED, DELETED, SHORT_URL, DESIGN_APPLIED
+
 console = Console()
 
 def get_api_keys():
@@ -22,132 +38,262 @@ def get_api_keys():
 def get_folder_id(api_key_a):
     console.print("[bold cyan]📂 Fetching Folder ID...[/bold cyan]")
 
-    result = subprocess.run(["python", "get_folder_id.py", api_key_a], capture_output=True, text=True)
-
-    print(result.stdout)
-
-    if "Error" in result.stdout:
-        console.print(f"[bold red]Error: Failed to fetch Folder[/bold red]")
-        sys.exit(1)
+    try:
+        folder_id = folder_step.get_folder_id(api_key_a)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to fetch Folder[/bold red] {e}")
+        return None
 
-    folder_id = result.stdout.split(":")[1].strip()
+    if folder_id:
+        print(f"FOLDER_ID for 'REBUILDS': {folder_id}")
 
     return folder_id
 
 def get_qr_codes(api_key_a, folder_id):
     console.print("[bold cyan]📱 Fetching QR Code data from ACCOUNT_A...[/bold cyan]")
 
-    result = subprocess.run(
-        ["python", "get_qr_codes.py", api_key_a, folder_id], capture_output=True, text=True
-    )
+    try:
+        qr_codes = qr_codes_step.get_qr_codes(api_key_a, folder_id)
+        if not qr_codes:
+            return None
 
-    if result.returncode != 0:
-        console.print(f"[bold red]Error: Failed to fetch QR Codes.[/bold red] {result.stderr}")
+        processed_data = qr_codes_step.process_qr_codes(qr_codes)
+        qr_codes_step.save_to_csv(processed_data)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to fetch QR Codes.[/bold red] {e}")
         return None
 
-    if "No QR Codes found" in result.stdout or not result.stdout.strip():
-        console.print("[bold red]Error: No QR Codes Found[/bold red]")
-        return None
-
-    return "csv-exports/qr_codes.csv"
+    return processed_data
 
-def get_designs(api_key_a):
+def get_designs(api_key_a, qr_codes, journal=None):
     console.print("[bold cyan]🎨 Fetching QR Code designs from ACCOUNT_A...[/bold cyan]")
-    result = subprocess.run(
-        ["python", "get_designs.py", api_key_a],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
-        console.print(f"[bold red]Error: Failed to fetch designs.[/bold red] {result.stderr}")
-        return False
 
-    return True
+    try:
+        designs = designs_step.get_designs(api_key_a, qr_codes, journal)
+        designs_step.save_designs(designs)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to fetch designs.[/bold red] {e}")
+        return None
+
+    return designs
 
-def create_qr_codes(api_key_b, csv_file_path):
+def create_qr_codes(api_key_b, qr_codes, journal=None):
     console.print("[bold cyan]🔨 Creating QR Codes in ACCOUNT_B...[/bold cyan]")
-    result = subprocess.run(["python", "create_qr_codes.py", api_key_b, csv_file_path], capture_output=True, text=True)
 
-    if result.returncode != 0:
-        console.print(f"[bold red]Error: Failed to create QR Codes in ACCOUNT_B.[/bold red] {result.stderr}")
+    try:
+        mapping = create_step.create_qr_codes_in_account_b(api_key_b, qr_codes, journal)
+        create_step.save_mapping_to_csv(mapping)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to create QR Codes in ACCOUNT_B.[/bold red] {e}")
         return None
 
-    return "csv-exports/qr_code_mapping.csv"
+    return mapping or None
 
-def delete_qr_codes(api_key_a):
+def delete_qr_codes(api_key_a, mapping, journal=None):
     console.print("[bold cyan]🚮 Deleting QR Codes from ACCOUNT_A...[/bold cyan]")
-    result = subprocess.run(["python", "delete_qr_codes.py", api_key_a], capture_output=True, text=True)
 
-    if result.returncode != 0:
-        console.print(f"[bold red]Error: Failed to delete QR Codes in ACCOUNT_A.[/bold red] {result.stderr}")
+    try:
+        delete_step.delete_qr_codes_in_account_a(api_key_a, mapping, journal)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to delete QR Codes in ACCOUNT_A.[/bold red] {e}")
         return False
 
     return True
 
-def update_short_urls(api_key_b):
+def update_short_urls(api_key_b, mapping, qr_codes, journal=None):
     console.print("[bold cyan]⏳ Updating short URLs in ACCOUNT_B...[/bold cyan]")
-    result = subprocess.run(["python", "update_short_urls.py", api_key_b], capture_output=True, text=True)
 
-    if result.returncode != 0:
-        console.print(f"[bold red]Error: Failed to update short URLs in ACCOUNT_B.[/bold red] {result.stderr}")
+    try:
+        short_urls_step.update_short_urls(api_key_b, mapping, short_urls_step.index_qr_codes(qr_codes), journal)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to update short URLs in ACCOUNT_B.[/bold red] {e}")
         return False
 
     return True
 
-def update_designs(api_key_b):
+def update_designs(api_key_b, mapping, designs, journal=None):
     console.print("[bold cyan]🎯 Applying designs to QR Codes in ACCOUNT_B...[/bold cyan]")
-    result = subprocess.run(
-        ["python", "update_designs.py", api_key_b],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
-        console.print(f"[bold red]Error: Failed to update designs.[/bold red] {result.stderr}")
+
+    try:
+        update_designs_step.apply_designs(api_key_b, mapping, designs, journal)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to update designs.[/bold red] {e}")
+        return False
+
+    return True
+
+def swap_short_urls(api_key_a, api_key_b, mapping, qr_codes, journal=None):
+    console.print("[bold cyan]🔁 Deleting in ACCOUNT_A and reassigning short URLs in ACCOUNT_B code by code...[/bold cyan]")
+
+    try:
+        short_urls_step.swap_short_urls(api_key_a, api_key_b, mapping, short_urls_step.index_qr_codes(qr_codes), journal)
+        create_step.save_mapping_to_csv(mapping)
+    except Exception as e:
+        console.print(f"[bold red]Error: Failed to swap short URLs.[/bold red] {e}")
         return False
 
     return True
 
+def stream_rebuild(api_key_a, api_key_b, qr_codes, swap=False, journal=None):
+    console.print("[bold cyan]🌊 Streaming each QR Code through create → delete → short URL → design...[/bold cyan]")
+
+    try:
+        mapping, designs = streaming.stream_rebuild(api_key_a, api_key_b, qr_codes, swap=swap, journal=journal)
+        designs_step.save_designs(designs)
+        create_step.save_mapping_to_csv(mapping)
+    except Exception as e:
+        console.print(f"[bold red]Error: Streaming rebuild failed.[/bold red] {e}")
+        return False
+
+    return bool(mapping)
+
+def load_qr_codes(file_path="csv-exports/qr_codes.csv"):
+    console.print(f"[bold cyan]♻️  Resuming from {JOURNAL_FILE} with QR Codes from {file_path}...[/bold cyan]")
+
+    try:
+        return create_step.load_csv_data(file_path)
+    except FileNotFoundError:
+        console.print(f"[bold red]Error: {file_path} not found, nothing to resume.[/bold red]")
+        return None
+
+def plan_rebuild(api_key_a, api_key_b, qr_codes, journal):
+    # Calls per code: design GET and DELETE on ACCOUNT_A; create, short URL PUT and design PATCH on ACCOUNT_B.
+    steps = ((api_key_a, DESIGN), (api_key_b, CREATED), (api_key_a, DELETED),
+             (api_key_b, SHORT_URL), (api_key_b, DESIGN_APPLIED))
+
+    pending = []
+    calls = defaultdict(int)
+    for qr in qr_codes:
+        todo = [(api_key, step) for api_key, step in steps if not journal.done(qr.id, step)]
+        if todo:
+            pending.append(qr)
+            for api_key, _ in todo:
+                calls[api_key] += 1
+
+    if not pending:
+        console.print("[bold green]Every QR Code in the journal is already migrated.[/bold green]")
+        return qr_codes
+
+    per_code = {api_key: total / len(pending) for api_key, total in calls.items()}
+    count = quota.plan("Rebuild", len(pending), per_code, unit_name="QR Codes")
+    if not count:
+        return []
+    if count < len(pending):
+        console.print(f"[bold yellow]Rebuilding {count} of {len(pending)} QR Codes. "
+                      f"Run again with --resume once the quota resets to migrate the rest.[/bold yellow]")
+
+    # Codes the journal already finished stay in, so the mapping and design files cover the whole run.
+    postponed = {qr.id for qr in pending[count:]}
+    return [qr for qr in qr_codes if qr.id not in postponed]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild Dynamic Website QR Codes from ACCOUNT_A into ACCOUNT_B.")
+    parser.add_argument("--stream", action="store_true",
+                        help="move each QR Code through every step on its own instead of one phase at a time")
+    parser.add_argument("--swap", action="store_true",
+                        help="delete in ACCOUNT_A and reassign the short URL in ACCOUNT_B back to back for each code, "
+                             "recording the downtime in the mapping CSV")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"continue an interrupted run, skipping every step already recorded in {JOURNAL_FILE}")
+    return parser.parse_args()
+
+def confirm_new_journal():
+    """Ask before replacing the progress of an earlier run; returns "resume", "new" or None to quit."""
+    console.print(f"[bold yellow]⚠️  {JOURNAL_FILE} holds progress from an earlier run. Starting over would create "
+                  f"the QR Codes it lists as created in ACCOUNT_B again.[/bold yellow]")
+    while True:
+        choice = console.input("[bold green]Resume that run (r), start over (s) or quit (q)?[/bold green] ").strip().lower()
+        if choice == "r":
+            return "resume"
+        if choice == "s":
+            archived = journal_step.archive()
+            console.print(f"[bold cyan]Previous journal moved to {archived}[/bold cyan]")
+            return "new"
+        if choice == "q":
+            return None
+
 def main():
+    args = parse_args()
+
+    if not args.resume and journal_step.has_entries():
+        choice = confirm_new_journal()
+        if choice is None:
+            return
+        args.resume = choice == "resume"
+
     # Step 1: Get API Keys
     API_KEY_A, API_KEY_B = get_api_keys()
 
-    # Step 2: Get FOLDER_ID (get_folder_id.py)
-    folder_id = get_folder_id(API_KEY_A)
-    if not folder_id:
-        console.print("[bold red]Error: Unable to fetch Folder ID, exiting process.[/bold red]")
+    journal = Journal(resume=args.resume)
+    try:
+        rebuild(args, API_KEY_A, API_KEY_B, journal)
+    finally:
+        journal.close()
+        concurrency.report()
+
+def rebuild(args, API_KEY_A, API_KEY_B, journal):
+    if args.resume:
+        # Steps 2-3: codes already deleted in ACCOUNT_A are no longer listed there, so reuse the saved list
+        qr_codes = load_qr_codes()
+        if not qr_codes:
+            return
+    else:
+        # Step 2: Get FOLDER_ID (get_folder_id.py)
+        folder_id = get_folder_id(API_KEY_A)
+        if not folder_id:
+            console.print("[bold red]Error: Unable to fetch Folder ID, exiting process.[/bold red]")
+            return
+
+        # Step 3: Get QR Codes from ACCOUNT_A and save to CSV (get_qr_codes.py)
+        qr_codes = get_qr_codes(API_KEY_A, folder_id)
+        if not qr_codes:
+            console.print("[bold red]Error: Unable to fetch QR Codes, exiting process.[/bold red]")
+            return
+
+    # Check the run fits in both tokens' monthly quota before touching anything
+    qr_codes = plan_rebuild(API_KEY_A, API_KEY_B, qr_codes, journal)
+    if not qr_codes:
+        console.print("[bold red]Nothing to rebuild within the monthly API quota, exiting process.[/bold red]")
         return
 
-    # Step 3: Get QR Codes from ACCOUNT_A and save to CSV (get_qr_codes.py)
-    qr_codes_csv = get_qr_codes(API_KEY_A, folder_id)
-    if not qr_codes_csv:
-        console.print("[bold red]Error: Unable to fetch QR Codes, exiting process.[/bold red]")
+    # Steps 4-8 per code, concurrently (streaming.py)
+    if args.stream:
+        if not stream_rebuild(API_KEY_A, API_KEY_B, qr_codes, swap=args.swap, journal=journal):
+            console.print("[bold red]Error: Streaming rebuild did not migrate any QR Codes.[/bold red]")
+            return
+        console.print("[bold magenta]✅ Rebuild process completed successfully![/bold magenta]")
         return
-    
+
     # Step 4: Get QR Code Designs from ACCOUNT_A (get_designs.py)
-    if not get_designs(API_KEY_A):
+    designs = get_designs(API_KEY_A, qr_codes, journal)
+    if designs is None:
         console.print("[bold red]Error: Unable to fetch designs, exiting process.[/bold red]")
         return
 
     # Step 5: Create QR Codes in ACCOUNT_B (create_qr_codes.py)
-    qr_code_mapping_csv = create_qr_codes(API_KEY_B, qr_codes_csv)
-    if not qr_code_mapping_csv:
+    qr_code_mapping = create_qr_codes(API_KEY_B, qr_codes, journal)
+    if not qr_code_mapping:
         console.print("[bold red]Error: Unable to create QR Codes in ACCOUNT_B, exiting process.[/bold red]")
         return
 
-    # Step 6: Delete QR Codes in ACCOUNT_A (delete_qr_codes.py)
-    if not delete_qr_codes(API_KEY_A):
-        console.print("[bold red]Error: Unable to delete QR Codes in ACCOUNT_A, exiting process.[/bold red]")
-        return
-
-    # Step 7: Update short URLs in ACCOUNT_B (update_short_urls.py)
-    if not update_short_urls(API_KEY_B):
-        console.print("[bold red]Error: Unable to update short URLs in ACCOUNT_B, exiting process.[/bold red]")
-        return
+    if args.swap:
+        # Steps 6-7 per code: delete in ACCOUNT_A, then reassign in ACCOUNT_B (update_short_urls.py)
+        if not swap_short_urls(API_KEY_A, API_KEY_B, qr_code_mapping, qr_codes, journal):
+            console.print("[bold red]Error: Unable to swap short URLs, exiting process.[/bold red]")
+            return
+    else:
+        # Step 6: Delete QR Codes in ACCOUNT_A (delete_qr_codes.py)
+        if not delete_qr_codes(API_KEY_A, qr_code_mapping, journal):
+            console.print("[bold red]Error: Unable to delete QR Codes in ACCOUNT_A, exiting process.[/bold red]")
+            return
+
+        # Step 7: Update short URLs in ACCOUNT_B (update_short_urls.py)
+        if not update_short_urls(API_KEY_B, qr_code_mapping, qr_codes, journal):
+            console.print("[bold red]Error: Unable to update short URLs in ACCOUNT_B, exiting process.[/bold red]")
+            return
     
     # Step 8: Update designs in ACCOUNT_B (update_designs.py)
-    if not update_designs(API_KEY_B):
+    if not update_designs(API_KEY_B, qr_code_mapping, designs, journal):
         console.print("[bold red]Error: Unable to update designs in ACCOUNT_B, exiting process.[/bold red]")
         return
 
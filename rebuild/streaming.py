@@ -0,0 +1,169 @@
+"""Streaming rebuild: every code moves through the steps on its own.
+
+Each step runs in its own thread and hands codes to the next step through a
+bounded queue, so the first code is fully migrated after a few seconds instead
+of at the very end, and total runtime approaches that of the slowest step.
+
+Designs are fetched from ACCOUNT_A before the code is deleted there, which
+overlaps design retrieval with creation in ACCOUNT_B. With ``swap`` the
+delete and short URL steps run back to back for each code and the measured
+downtime is recorded in the mapping. With a ``journal`` every finished step is
+recorded and steps already in the journal are skipped.
+"""
+import queue
+import threading
+
+import get_designs as designs_step
+import create_qr_codes as create_step
+import delete_qr_codes as delete_step
+import update_short_urls as short_urls_step
+import update_designs as update_designs_step
+from journal import DESIGN, CREATED, DELETED, SHORT_URL, DESIGN_APPLIED
+
+QUEUE_SIZE = 50
+
+STOP = object()
+
+
+def report_failure(name, item, error):
+    # Must never raise: a dead stage thread would leave the stages upstream blocked on a full queue.
+    try:
+        print(f"❌ {name} failed for QR {item['qr'].id}: {error}")
+    except Exception:
+        print(f"❌ {name} failed: {error!r}")
+
+
+def run_stage(name, work, inbox, outbox, errors):
+    while True:
+        item = inbox.get()
+        if item is STOP:
+            if outbox is not None:
+                outbox.put(STOP)
+            return
+
+        if errors:
+            # Another stage died; keep draining so nothing upstream blocks on a full queue.
+            continue
+
+        try:
+            item = work(item)
+        except Exception as e:
+            report_failure(name, item, e)
+            item = None
+        except BaseException as e:
+            errors.append(e)
+            item = None
+
+        if item is not None and outbox is not None:
+            outbox.put(item)
+
+
+def stream_rebuild(api_key_a, api_key_b, qr_codes, swap=False, journal=None):
+    designs = {}
+    mapping = []
+
+    def done(item, step):
+        return journal is not None and journal.done(item["qr"].id, step)
+
+    def record(item, step, value=True):
+        if journal is not None:
+            journal.record(item["qr"].id, step, value)
+
+    def fetch_design(item):
+        id_a = str(item["qr"].id)
+        if done(item, DESIGN):
+            designs[id_a] = journal.get(id_a, DESIGN)
+            return item
+        design = designs_step.get_design(api_key_a, id_a)
+        if design is not None:
+            designs[id_a] = design
+            record(item, DESIGN, design)
+        return item
+
+    def create(item):
+        qr = item["qr"]
+        if done(item, CREATED):
+            id_b = journal.get(qr.id, CREATED)
+        else:
+            id_b = create_step.create_qr_code_in_account_b(api_key_b, qr.title, qr.target_url)
+            if not id_b:
+                # Never delete the original when its replacement was not created.
+                return None
+            record(item, CREATED, id_b)
+        item["id_b"] = id_b
+        item["mapping"] = {"ID_A": qr.id, "ID_B": id_b}
+        mapping.append(item["mapping"])
+        return item
+
+    def delete(item):
+        if done(item, DELETED):
+            item["deleted"] = True
+            return item
+        item["deleted"] = delete_step.delete_qr_code_in_account_a(api_key_a, item["qr"].id)
+        if item["deleted"]:
+            record(item, DELETED)
+        return item
+
+    def update_short_url(item):
+        qr = item["qr"]
+        if done(item, SHORT_URL):
+            return item
+        if not item["deleted"]:
+            print(f"Skipping short URL update for ID_B: {item['id_b']}, ID_A: {qr.id} was not deleted")
+            return item
+        if short_urls_step.update_short_url_in_account_b(api_key_b, item["id_b"], qr.short_code, qr.domain_id):
+            record(item, SHORT_URL)
+        return item
+
+    def swap_short_url(item):
+        qr = item["qr"]
+        if done(item, SHORT_URL):
+            downtime = journal.get(qr.id, SHORT_URL)
+            item["deleted"] = True
+            item["mapping"]["DOWNTIME_S"] = f"{downtime:.3f}" if not isinstance(downtime, bool) else ""
+            return item
+        item["deleted"], downtime = short_urls_step.swap_short_url(
+            api_key_a, api_key_b, qr.id, item["id_b"], qr.short_code, qr.domain_id, journal
+        )
+        item["mapping"]["DOWNTIME_S"] = f"{downtime:.3f}" if downtime is not None else ""
+        return item
+
+    def apply_design(item):
+        if done(item, DESIGN_APPLIED):
+            return item
+        if update_designs_step.apply_design(api_key_b, item["qr"].id, item["id_b"], designs):
+            record(item, DESIGN_APPLIED)
+        return item
+
+    if swap:
+        handover = [("Short URL swap", swap_short_url)]
+    else:
+        handover = [("Delete", delete), ("Short URL update", update_short_url)]
+
+    stages = [
+        ("Design fetch", fetch_design),
+        ("Create", create),
+        *handover,
+        ("Design update", apply_design),
+    ]
+
+    queues = [queue.Queue(maxsize=QUEUE_SIZE) for _ in stages]
+    errors = []
+    threads = []
+    for i, (name, work) in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(queues) else None
+        thread = threading.Thread(target=run_stage, args=(name, work, queues[i], outbox, errors), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    for qr in qr_codes:
+        queues[0].put({"qr": qr, "id_b": None, "deleted": False})
+    queues[0].put(STOP)
+
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return mapping, designs
@@ -1,10 +1,81 @@
 import csv
 import json
+import os
 import sys
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-API_BASE = "https://api.qrcg.com/v3/qrcodes"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client, concurrency
+from get_designs import get_headers
+from journal import DESIGN_APPLIED
+
+API_BASE = client.v3_url("qrcodes")
+DESIGN_WORKERS = concurrency.MAX_LIMIT
+
+
+def build_design_payload(design):
+    customizations = design.get("customizations", {})
+
+    logo = customizations.get("logo")
+    if logo and isinstance(logo, dict):
+        logo_name = logo.get("name", "")
+        if logo_name.startswith("account"):
+            customizations["logo"] = {"name": "no-logo"}
+
+    return {
+        "status": design.get("status", "active"),
+        "url": design.get("url"),
+        "title": design.get("title"),
+        "customizations": customizations
+    }
+
+
+def apply_design(api_key, old_id, new_id, designs):
+    design = designs.get(str(old_id))
+    if not design:
+        print(f"⚠ No design found for old QR {old_id}")
+        return False
+
+    if not design.get("customizations"):
+        print(f"⚠ QR {old_id} has no customizations, skipping")
+        return False
+
+    response = client.patch(
+        f"{API_BASE}/{new_id}",
+        headers=get_headers(api_key),
+        json=build_design_payload(design)
+    )
+
+    if response.status_code not in (200, 204):
+        print(f"❌ Failed to update design for new QR {new_id}")
+        return False
+
+    print(f"🎨 Design applied to new QR {new_id}")
+    return True
+
+
+def apply_designs(api_key, mappings, designs, journal=None, workers=DESIGN_WORKERS):
+    def apply(row):
+        old_id = row.get("ID_A")
+        new_id = row.get("ID_B")
+
+        if not old_id or not new_id:
+            return
+
+        if journal and journal.done(old_id, DESIGN_APPLIED):
+            return
+
+        if apply_design(api_key, old_id, new_id, designs) and journal:
+            journal.record(old_id, DESIGN_APPLIED)
+
+    # The adaptive limit in qrcg.concurrency decides how many updates are really in flight.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(apply, mappings))
+
+    print("Design update process complete.")
+
 
 def main():
     if len(sys.argv) != 2:
@@ -22,58 +93,8 @@ def main():
 
     designs = json.loads(designs_file.read_text())
 
-    headers = {
-        "Authorization": f"Key {api_key}",
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
-
     with mapping_csv.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            old_id = row.get("ID_A")
-            new_id = row.get("ID_B")
-
-            if not old_id or not new_id:
-                continue
-
-            design = designs.get(old_id)
-            if not design:
-                print(f"⚠ No design found for old QR {old_id}")
-                continue
-
-            if not design.get("customizations"):
-                print(f"⚠ QR {old_id} has no customizations, skipping")
-                continue
-
-            customizations = design.get("customizations", {})
-
-            logo = customizations.get("logo")
-            if logo and isinstance(logo, dict):
-                logo_name = logo.get("name", "")
-                if logo_name.startswith("account"):
-                    customizations["logo"] = {"name": "no-logo"}
-
-            payload = {
-                "status": design.get("status", "active"),
-                "url": design.get("url"),
-                "title": design.get("title"),
-                "customizations": customizations
-            }
-
-            response = requests.patch(
-                f"{API_BASE}/{new_id}",
-                headers=headers,
-                json=payload
-            )
-
-            if response.status_code not in (200, 204):
-                print(f"❌ Failed to update design for new QR {new_id}")
-                continue
-
-            print(f"🎨 Design applied to new QR {new_id}")
-
-    print("Design update process complete.")
+        apply_designs(api_key, csv.DictReader(f), designs)
 
 if __name__ == "__main__":
     main()
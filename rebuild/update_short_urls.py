@@ -1,9 +1,16 @@
+import os
 import sys
 import csv
-import requests
 import json
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client
+from qrcg.records import QRCode
+from delete_qr_codes import delete_qr_code_in_account_a
+from journal import DELETED, SHORT_URL
+
 def load_mapping_from_csv(file_path="csv-exports/qr_code_mapping.csv"):
     mappings = []
     with open(file_path, mode='r', encoding='utf-8') as csvfile:
@@ -11,52 +18,95 @@ def load_mapping_from_csv(file_path="csv-exports/qr_code_mapping.csv"):
         mappings = [row for row in reader]
     return mappings
 
+def index_qr_codes(qr_codes):
+    return {str(qr.id): qr for qr in qr_codes}
+
 def load_qr_codes_from_csv(file_path="csv-exports/qr_codes.csv"):
-    qr_codes = {}
     with open(file_path, mode='r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            id_a = row['id']
-            qr_codes[id_a] = {
-                'domain_id': row['domain_id'],
-                'short_code': row['short_code']
-            }
-    return qr_codes
+        return index_qr_codes(QRCode.from_row(row) for row in csv.DictReader(csvfile))
 
 def update_short_url_in_account_b(api_key_b, id_b, short_code, domain_id):
-    url = f"https://api.qr-code-generator.com/v1/codes/{id_b}?access-token={api_key_b}"
+    url = client.v1_url(f"codes/{id_b}?access-token={api_key_b}")
     headers = {"Content-Type": "application/json"}
     payload = {
         "short_code": short_code,
         "domain_id": domain_id
     }
-    response = requests.put(url, headers=headers, data=json.dumps(payload))
+    response = client.put(url, headers=headers, data=json.dumps(payload))
     if response.status_code == 200:
         print(f"Successfully updated short URL for ID_B: {id_b}")
+        return True
     else:
         print(f"Failed to update short URL for ID_B: {id_b}. Status code: {response.status_code}")
+        return False
 
-def update_qr_codes_short_urls(api_key_b, mapping_file="csv-exports/qr_code_mapping.csv", qr_codes_file="csv-exports/qr_codes.csv"):
-    mappings = load_mapping_from_csv(mapping_file)
-    qr_codes_data = load_qr_codes_from_csv(qr_codes_file)
-
-    request_count = 0
+def update_short_urls(api_key_b, mappings, qr_codes_data, journal=None):
     for mapping in mappings:
-        id_a = mapping['ID_A']
+        id_a = str(mapping['ID_A'])
         id_b = mapping['ID_B']
 
+        if journal and journal.done(id_a, SHORT_URL):
+            continue
+
         if id_a in qr_codes_data:
-            short_code = qr_codes_data[id_a]['short_code']
-            domain_id = qr_codes_data[id_a]['domain_id']
-            update_short_url_in_account_b(api_key_b, id_b, short_code, domain_id)
-
-            request_count += 1
-            if request_count % 10 == 0:
-                print("Rate limit reached, waiting for 1 second...")
-                time.sleep(1)
+            short_code = qr_codes_data[id_a].short_code
+            domain_id = qr_codes_data[id_a].domain_id
+            if update_short_url_in_account_b(api_key_b, id_b, short_code, domain_id) and journal:
+                journal.record(id_a, SHORT_URL)
         else:
             print(f"No data found for ID_A: {id_a} in qr_codes.csv. Skipping update for ID_B: {id_b}")
 
+def swap_short_url(api_key_a, api_key_b, id_a, id_b, short_code, domain_id, journal=None):
+    # Delete in A and reassign in B back to back; the short code is dead in between.
+    start = time.monotonic()
+    if not (journal and journal.done(id_a, DELETED)):
+        if not delete_qr_code_in_account_a(api_key_a, id_a):
+            return False, None
+        if journal:
+            journal.record(id_a, DELETED)
+
+    if not update_short_url_in_account_b(api_key_b, id_b, short_code, domain_id):
+        print(f"⚠️  Short code {short_code} is unassigned: ID_A {id_a} was deleted but ID_B {id_b} could not take it over")
+        return True, None
+
+    downtime = time.monotonic() - start
+    if journal:
+        journal.record(id_a, SHORT_URL, round(downtime, 3))
+    return True, downtime
+
+def swap_short_urls(api_key_a, api_key_b, mappings, qr_codes_data, journal=None):
+    downtimes = []
+    for mapping in mappings:
+        id_a = str(mapping['ID_A'])
+        id_b = mapping['ID_B']
+        mapping['DOWNTIME_S'] = ""
+
+        if journal and journal.done(id_a, SHORT_URL):
+            downtime = journal.get(id_a, SHORT_URL)
+            if not isinstance(downtime, bool):
+                mapping['DOWNTIME_S'] = f"{downtime:.3f}"
+            continue
+
+        if id_a not in qr_codes_data:
+            print(f"No data found for ID_A: {id_a} in qr_codes.csv. Skipping swap for ID_B: {id_b}")
+            continue
+
+        short_code = qr_codes_data[id_a].short_code
+        domain_id = qr_codes_data[id_a].domain_id
+        _, downtime = swap_short_url(api_key_a, api_key_b, id_a, id_b, short_code, domain_id, journal)
+        if downtime is not None:
+            mapping['DOWNTIME_S'] = f"{downtime:.3f}"
+            downtimes.append(downtime)
+
+    if downtimes:
+        print(f"Short URL downtime per code: avg {sum(downtimes) / len(downtimes):.3f}s, max {max(downtimes):.3f}s")
+
+def update_qr_codes_short_urls(api_key_b, mapping_file="csv-exports/qr_code_mapping.csv", qr_codes_file="csv-exports/qr_codes.csv"):
+    mappings = load_mapping_from_csv(mapping_file)
+    qr_codes_data = load_qr_codes_from_csv(qr_codes_file)
+
+    update_short_urls(api_key_b, mappings, qr_codes_data)
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Error: API_KEY_B is required.")
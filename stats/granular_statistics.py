@@ -1,85 +1,515 @@
 import csv
+import json
 import requests
-import time
-from datetime import datetime
-from io import StringIO
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from io import TextIOWrapper
 import os
 
-def fetch_qr_code_data(qr_code_id, access_token, created_date):
-    created_date_obj = datetime.strptime(created_date, "%Y-%m-%dT%H:%M:%S.%fZ") if 'T' in created_date else datetime.strptime(created_date, "%Y-%m-%d %H:%M:%S")
-    from_date = created_date_obj.strftime("%Y-%m-%d")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-    to_date = datetime.now().strftime("%Y-%m-%d")
+from qrcg import client, concurrency, quota
+from scan_dataset import ScanDataset
 
-    url = f"https://api.qr-code-generator.com/v1/export/{qr_code_id}?access-token={access_token}&type=totals&from={from_date}&to={to_date}"
+# Threads only; how many exports actually run at once is up to qrcg.concurrency.
+EXPORT_WORKERS = concurrency.MAX_LIMIT
+EXPORT_STATE_FILE = "export_state.jsonl"
+SCAN_SNAPSHOT_FILE = "scan_snapshot.json"
+SNAPSHOT_SINKS = ("csv", "dataset")
+DATASET_FOLDER = "scan-dataset"
+CHUNK_SIZE = 64 * 1024
+# Ranges longer than this are split into WINDOW_MONTHS-long calendar windows fetched in parallel.
+WINDOW_SPLIT_DAYS = 92
+WINDOW_MONTHS = 3
+WINDOW_WORKERS = 3
+WINDOW_ATTEMPTS = 3
+DEFAULT_FIELDNAMES = ["Date/time", "Country Name", "Country ISO", "City", "Device", "Operating System", "Unique Visitor"]
 
-    try:
-        response = requests.get(url)
+def parse_created_date(created_date):
+    return datetime.strptime(created_date, "%Y-%m-%dT%H:%M:%S.%fZ") if 'T' in created_date else datetime.strptime(created_date, "%Y-%m-%d %H:%M:%S")
 
-        if response.status_code == 200:
-            return parse_csv_response(response.text)
-        else:
-            print(f"Failed to fetch data for QR Code {qr_code_id}: {response.status_code} - {response.text}")
-            return None
+def export_url(qr_code_id, access_token, created_date, from_date=None, to_date=None):
+    if from_date is None:
+        from_date = parse_created_date(created_date).strftime("%Y-%m-%d")
+
+    if to_date is None:
+        to_date = datetime.now().strftime("%Y-%m-%d")
+
+    return client.v1_url(f"export/{qr_code_id}?access-token={access_token}&type=totals&from={from_date}&to={to_date}")
+
+# Responses are streamed rather than read into memory, so memory stays flat however many scans a code has.
+def open_export(qr_code_id, access_token, created_date, from_date=None, to_date=None):
+    url = export_url(qr_code_id, access_token, created_date, from_date, to_date)
+
+    try:
+        response = client.get(url, stream=True)
     except requests.exceptions.RequestException as e:
         print(f"Error occurred while fetching data for QR Code {qr_code_id}: {e}")
         return None
 
-def parse_csv_response(csv_data):
-    csv_file = StringIO(csv_data)
-    reader = csv.DictReader(csv_file)
+    if response.status_code != 200:
+        print(f"Failed to fetch data for QR Code {qr_code_id}: {response.status_code} - {response.text}")
+        response.close()
+        return None
+
+    return response
+
+def date_windows(from_date, to_date, months=WINDOW_MONTHS):
+    start = datetime.strptime(from_date, "%Y-%m-%d").date()
+    end = datetime.strptime(to_date, "%Y-%m-%d").date()
+
+    if (end - start).days < WINDOW_SPLIT_DAYS:
+        return [(from_date, to_date)]
+
+    # Calendar-aligned windows: the first may be partial, the rest start on the 1st.
+    windows = []
+    while start <= end:
+        month_index = start.year * 12 + start.month - 1 + months
+        next_start = date(month_index // 12, month_index % 12 + 1, 1)
+        windows.append((start.isoformat(), min(end, next_start - timedelta(days=1)).isoformat()))
+        start = next_start
+
+    return windows
+
+class StreamedExport:
+    """A single export response, read straight from the socket."""
+
+    def __init__(self, response):
+        self.response = response
+
+    def iter_chunks(self):
+        return self.response.iter_content(CHUNK_SIZE)
+
+    def rows(self):
+        self.response.raw.decode_content = True
+        # Without this urllib3 reports the stream as closed before TextIOWrapper has read it.
+        self.response.raw.auto_close = False
+        # Exports are UTF-8; requests would guess ISO-8859-1 for a text/csv without a charset.
+        text = TextIOWrapper(self.response.raw, encoding="utf-8", newline="")
+        return csv.DictReader(text)
+
+    def close(self):
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class WindowedExport(StreamedExport):
+    """Window downloads spooled to disk, read back in date order as one export."""
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def iter_chunks(self):
+        # The header comes from the first window with any content; windows can come back empty.
+        header_sent = False
+        for path in self.paths:
+            with open(path, mode='rb') as file:
+                if header_sent:
+                    file.readline()  # every window repeats the header
+                while True:
+                    chunk = file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    header_sent = True
+                    yield chunk
+
+    def rows(self):
+        for path in self.paths:
+            with open(path, mode='r', newline='', encoding='utf-8') as file:
+                yield from csv.DictReader(file)
+
+    def close(self):
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+def download_window(qr_code_id, access_token, from_date, to_date, work_folder):
+    for attempt in range(1, WINDOW_ATTEMPTS + 1):
+        response = open_export(qr_code_id, access_token, None, from_date, to_date)
+        if response is not None:
+            fd, path = tempfile.mkstemp(prefix=f"{qr_code_id}_{from_date}_", suffix=".part", dir=work_folder)
+            try:
+                with response, os.fdopen(fd, mode='wb') as file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        file.write(chunk)
+                return path
+            except requests.exceptions.RequestException as e:
+                print(f"Window {from_date}..{to_date} of QR Code {qr_code_id} broke off: {e}")
+                os.remove(path)
+
+        if attempt < WINDOW_ATTEMPTS:
+            print(f"Retrying window {from_date}..{to_date} of QR Code {qr_code_id} ({attempt}/{WINDOW_ATTEMPTS - 1})")
+
+    return None
+
+def open_export_body(qr_code_id, access_token, created_date, work_folder, from_date=None, to_date=None):
+    if from_date is None:
+        from_date = parse_created_date(created_date).strftime("%Y-%m-%d")
+    if to_date is None:
+        to_date = datetime.now().strftime("%Y-%m-%d")
+
+    windows = date_windows(from_date, to_date)
+    if len(windows) == 1:
+        response = open_export(qr_code_id, access_token, created_date, from_date, to_date)
+        return StreamedExport(response) if response is not None else None
+
+    os.makedirs(work_folder, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=WINDOW_WORKERS) as executor:
+        paths = list(executor.map(
+            lambda window: download_window(qr_code_id, access_token, window[0], window[1], work_folder),
+            windows,
+        ))
+
+    body = WindowedExport([path for path in paths if path])
+    if None in paths:
+        print(f"Failed to fetch {paths.count(None)}/{len(windows)} date window(s) for QR Code {qr_code_id}")
+        body.close()
+        return None
+
+    return body
+
+def stream_to_csv(body, qr_code_id, output_filename):
+    # No transformation needed: copy the body to disk chunk by chunk.
+    written = 0
+    with open(output_filename, mode='wb') as file:
+        for chunk in body.iter_chunks():
+            file.write(chunk)
+            written += len(chunk)
+
+    if not written:
+        with open(output_filename, mode='w', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerow(DEFAULT_FIELDNAMES)
+
+    print(f"Data for QR Code {qr_code_id} has been successfully saved!")
+
+def stream_to_dataset(body, qr_code_id, dataset, on_flushed=None):
+    staged = dataset.stage(qr_code_id)
+    try:
+        for row in body.rows():
+            staged.add(row)
+    except BaseException:
+        staged.discard()
+        raise
+
+    staged.commit(on_flushed=on_flushed)
+
+def export_path(qr_code_id, title, output_folder):
+    sanitized_title = (title.replace(" ", "_").replace(",", "").replace("/", "_")[:20]) if title else "No_Title"
+
+    return os.path.join(output_folder, f"{qr_code_id}_{sanitized_title}.csv")
+
+def append_to_csv(body, qr_code_id, output_filename):
+    if not os.path.exists(output_filename):
+        stream_to_csv(body, qr_code_id, output_filename)
+        return
+
+    # Keep the existing column order; the header is already there.
+    with open(output_filename, mode='r', newline='', encoding='utf-8') as file:
+        fieldnames = next(csv.reader(file), None) or DEFAULT_FIELDNAMES
+
+    # Stage the rows next to the file and append them only once the whole body was read,
+    # so a connection dropped halfway leaves nothing behind for the next run to duplicate.
+    fd, staged_path = tempfile.mkstemp(prefix=f".{qr_code_id}_", suffix=".part",
+                                       dir=os.path.dirname(output_filename) or ".")
+    try:
+        appended = 0
+        with os.fdopen(fd, mode='w', newline='', encoding='utf-8') as staged:
+            writer = csv.DictWriter(staged, fieldnames=fieldnames, extrasaction='ignore')
+            for row in body.rows():
+                writer.writerow(row)
+                appended += 1
+
+        with open(staged_path, mode='rb') as staged, open(output_filename, mode='ab') as file:
+            while True:
+                chunk = staged.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                file.write(chunk)
+    finally:
+        os.remove(staged_path)
+
+    print(f"Appended {appended} row(s) for QR Code {qr_code_id}.")
+
+def read_export_state(output_folder):
+    state = {}
+    path = os.path.join(output_folder, EXPORT_STATE_FILE)
+    if os.path.exists(path):
+        with open(path, mode='r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                state[entry["id"]] = entry
+    return state
 
-    parsed_data = [row for row in reader]
-    return parsed_data
+class ExportState:
+    """Last fully exported day per QR code, kept as an append-only JSONL log.
 
-def save_to_csv(parsed_data, qr_code_id, title, output_folder):
-    if parsed_data or not parsed_data:
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+    Incremental exports only cover complete days (up to yesterday), so the
+    next run starts the day after and never re-fetches or duplicates a day.
+    """
 
-        sanitized_title = (title.replace(" ", "_").replace(",", "").replace("/", "_")[:20]) if title else "No_Title"
+    def __init__(self, output_folder):
+        self.path = os.path.join(output_folder, EXPORT_STATE_FILE)
+        self.state = read_export_state(output_folder)
+        self.lock = threading.Lock()
 
-        output_filename = os.path.join(output_folder, f"{qr_code_id}_{sanitized_title}.csv")
+        # Rewrite compacted, then append one line per export from here on. The compacted copy
+        # replaces the log in one step, so an interruption never leaves it truncated.
+        os.makedirs(output_folder, exist_ok=True)
+        with open(f"{self.path}.tmp", mode='w', encoding='utf-8') as file:
+            for entry in self.state.values():
+                file.write(json.dumps(entry) + "\n")
+        os.replace(f"{self.path}.tmp", self.path)
+        self.file = open(self.path, mode='a', encoding='utf-8')
 
-        fieldnames = parsed_data[0].keys() if parsed_data else ["Date/time", "Country Name", "Country ISO", "City", "Device", "Operating System", "Unique Visitor"]
+    def get(self, qr_code_id):
+        return self.state.get(str(qr_code_id))
 
-        with open(output_filename, mode='w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            if parsed_data:
-                writer.writerows(parsed_data)
+    def update(self, qr_code_id, last_date, output_filename):
+        entry = {"id": str(qr_code_id), "last_date": last_date, "file": output_filename}
+        with self.lock:
+            self.state[entry["id"]] = entry
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+def export_qr_code_incremental(row, access_token, output_folder, state, dataset=None):
+    qr_code_id = row.get("ID")
+    previous = state.get(qr_code_id)
+
+    to_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    if previous:
+        from_date = (datetime.strptime(previous["last_date"], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        output_filename = previous["file"]
+    elif dataset is not None:
+        from_date = parse_created_date(row.get("Created")).strftime("%Y-%m-%d")
+        output_filename = dataset.folder
+    else:
+        from_date = parse_created_date(row.get("Created")).strftime("%Y-%m-%d")
+        output_filename = export_path(qr_code_id, row.get("Title", "No_Title"), output_folder)
+
+    if from_date > to_date:
+        print(f"QR Code {qr_code_id} is already exported up to {to_date}.")
+        return True
+
+    body = open_export_body(qr_code_id, access_token, row.get("Created"), output_folder, from_date, to_date)
+    if body is None:
+        return False
+
+    with body:
+        if dataset is not None:
+            # Only mark the days as exported once the rows have actually reached disk.
+            stream_to_dataset(body, qr_code_id, dataset,
+                              on_flushed=lambda: state.update(qr_code_id, to_date, output_filename))
+            return True
+
+        if previous:
+            append_to_csv(body, qr_code_id, output_filename)
+        else:
+            # No state yet: this body is the full history, so replace any file a normal export left behind.
+            stream_to_csv(body, qr_code_id, output_filename)
+
+    state.update(qr_code_id, to_date, output_filename)
+    return True
+
+def export_qr_code(row, access_token, output_folder, state=None, dataset=None):
+    qr_code_id = row.get("ID")
+    title = row.get("Title", "No_Title")
+
+    try:
+        if state is not None:
+            return export_qr_code_incremental(row, access_token, output_folder, state, dataset)
+
+        body = open_export_body(qr_code_id, access_token, row.get("Created"), output_folder)
+        if body is None:
+            return False
+
+        with body:
+            if dataset is not None:
+                stream_to_dataset(body, qr_code_id, dataset)
             else:
-                writer.writerow({field: "" for field in fieldnames})
+                os.makedirs(output_folder, exist_ok=True)
+                stream_to_csv(body, qr_code_id, export_path(qr_code_id, title, output_folder))
+        return True
+    except Exception as e:
+        print(f"Export failed for QR Code {qr_code_id}: {e}")
+        return False
+
+def scan_counters(row):
+    try:
+        return [int(row["Total Scans"]), int(row["Unique Scans"])]
+    except (KeyError, TypeError, ValueError):
+        # Static codes and hand-made CSVs carry no counters to compare.
+        return None
+
+def load_scan_snapshot(output_folder):
+    """Scan counters at the last export, kept separately per sink ("csv" files or the "dataset")."""
+    try:
+        with open(os.path.join(output_folder, SCAN_SNAPSHOT_FILE), mode='r', encoding='utf-8') as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    # Older snapshots were one map shared by both sinks; those codes are simply exported again once.
+    if not isinstance(snapshot, dict):
+        return {}
+    return {sink: snapshot[sink] for sink in SNAPSHOT_SINKS if isinstance(snapshot.get(sink), dict)}
+
+def save_scan_snapshot(snapshot, output_folder):
+    os.makedirs(output_folder, exist_ok=True)
+    path = os.path.join(output_folder, SCAN_SNAPSHOT_FILE)
+
+    with open(f"{path}.tmp", mode='w', encoding='utf-8') as file:
+        json.dump(snapshot, file)
+    os.replace(f"{path}.tmp", path)
+
+def needs_export(row, snapshot, previous_export=None, yesterday=None):
+    counters = scan_counters(row)
+    if counters is None:
+        return True
 
-        print(f"Data for QR Code {qr_code_id} has been successfully saved!")
+    if previous_export is not None and previous_export["last_date"] < yesterday:
+        # Incremental exports stop at yesterday while the counters include today, so days
+        # after last_date may hold scans that unchanged counters no longer reveal.
+        return True
+
+    previous = snapshot.get(row["ID"])
+    if previous is None:
+        # Never exported: only worth a call once something has been scanned.
+        return counters != [0, 0]
+    return counters != previous
+
+def export_calls(row, previous=None, incremental=False):
+    """API calls one export will make: one per date window, 0 if it is already up to date."""
+    if incremental:
+        to_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        to_date = datetime.now().strftime("%Y-%m-%d")
+
+    if previous:
+        from_date = (datetime.strptime(previous["last_date"], "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
     else:
-        print(f"No data to save for QR Code {qr_code_id}.")
+        from_date = parse_created_date(row.get("Created")).strftime("%Y-%m-%d")
+
+    if from_date > to_date:
+        return 0
+    return len(date_windows(from_date, to_date))
+
+def plan_exports(rows, access_token, previous, incremental=False):
+    """Check the exports against the monthly quota and return how many of ``rows`` to run now."""
+    calls = sum(export_calls(row, previous.get(row["ID"]), incremental) for row in rows)
+    if not rows or not calls:
+        return len(rows)
+    return quota.plan("Granular export", len(rows), {access_token: calls / len(rows)}, unit_name="QR Codes")
 
-def process_qr_codes(csv_filename, access_token, output_folder):
+def save_failed_report(failed_rows, fieldnames, output_folder, name="failed_exports.csv"):
+    # Same columns as the input, so the report can be fed straight back in for a retry.
+    report = os.path.join(output_folder, name)
+    os.makedirs(output_folder, exist_ok=True)
+
+    with open(report, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(failed_rows)
+
+    return report
+
+def open_dataset(output_folder, incremental):
+    # Incremental runs keep appending to one dataset; full exports get a fresh one per run.
+    if incremental:
+        return ScanDataset(os.path.join(output_folder, DATASET_FOLDER))
+    return ScanDataset(os.path.join(output_folder, f"{DATASET_FOLDER}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"))
+
+def process_qr_codes(csv_filename, access_token, output_folder, workers=EXPORT_WORKERS, incremental=False, force=False,
+                     consolidated=False):
     try:
         with open(csv_filename, mode='r') as file:
             reader = csv.DictReader(file)
+            fieldnames = reader.fieldnames
 
-            call_count = 0
-
+            rows = []
             for row in reader:
-                qr_code_id = row.get("ID")
-                created_date = row.get("Created")
-                title = row.get("Title", "No_Title")
+                if row.get("ID") and row.get("Created"):
+                    rows.append(row)
+                else:
+                    print(f"Skipping row due to missing ID or Created date: {row}")
 
-                if qr_code_id and created_date:
-                    parsed_data = fetch_qr_code_data(qr_code_id, access_token, created_date)
+        # Incremental state lives next to what it tracks: the dataset folder or the CSV folder.
+        previous = {}
+        if incremental:
+            previous = read_export_state(os.path.join(output_folder, DATASET_FOLDER) if consolidated else output_folder)
 
-                    save_to_csv(parsed_data, qr_code_id, title, output_folder)
+        sinks = load_scan_snapshot(output_folder)
+        snapshot = sinks.setdefault("dataset" if consolidated else "csv", {})
+        # A full dataset export starts a fresh folder, which has to hold every code; it neither
+        # skips codes nor vouches for the incremental dataset in the snapshot.
+        fresh_dataset = consolidated and not incremental
+        if not force and not fresh_dataset:
+            total = len(rows)
+            yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+            rows = [row for row in rows if needs_export(row, snapshot, previous.get(row["ID"]), yesterday)]
+            if total - len(rows):
+                print(f"Skipping {total - len(rows)} QR Code(s) whose scan counts have not changed since the last export.")
 
-                    call_count += 1
+        if not rows:
+            print("Nothing to export.")
+            return
 
-                    if call_count >= 10:
-                        print("Reached 10 API calls. Waiting for 1 second...")
-                        time.sleep(1)
-                        call_count = 0
-                else:
-                    print(f"Skipping row due to missing ID or Created date: {row}")
+        count = plan_exports(rows, access_token, previous, incremental)
+        if not count:
+            print("Granular export cancelled.")
+            return
+        rows, postponed_rows = rows[:count], rows[count:]
+
+        failed_rows = []
+        dataset = open_dataset(output_folder, incremental) if consolidated else None
+        state = ExportState(dataset.folder if dataset else output_folder) if incremental else None
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(export_qr_code, row, access_token, output_folder, state, dataset): row
+                    for row in rows
+                }
+
+                for future in as_completed(futures):
+                    row = futures[future]
+                    if not future.result():
+                        failed_rows.append(row)
+                    elif scan_counters(row) is not None and not fresh_dataset:
+                        snapshot[row["ID"]] = scan_counters(row)
+        finally:
+            if dataset is not None:
+                dataset.close()
+                print(f"Scan rows written to {dataset.folder}")
+            if state is not None:
+                state.close()
+            save_scan_snapshot(sinks, output_folder)
+
+        print(f"Exported {len(rows) - len(failed_rows)}/{len(rows)} QR Code(s).")
+        concurrency.report()
+
+        if failed_rows:
+            report = save_failed_report(failed_rows, fieldnames, output_folder)
+            print(f"Failed QR Code IDs: {', '.join(row['ID'] for row in failed_rows)}")
+            print(f"Rerun with '{report}' to retry only the failed exports.")
+
+        if postponed_rows:
+            report = save_failed_report(postponed_rows, fieldnames, output_folder, "postponed_exports.csv")
+            print(f"{len(postponed_rows)} QR Code(s) did not fit in this month's quota.")
+            print(f"Rerun with '{report}' from {quota.next_reset().isoformat()} on to export them.")
 
     except FileNotFoundError:
         print(f"Error: The file '{csv_filename}' was not found.")
@@ -91,6 +521,13 @@ if __name__ == "__main__":
 
     csv_filename = input("Enter the CSV file name (full path, e.g., /Users/user1/qrcg-api-statistics/csv-exports/qrcg_statistics_12345.csv): ").strip()
 
+    incremental = input("Only export days since the last export? (y/n): ").strip().lower() == "y"
+
+    force = input("Re-export codes whose scan counts have not changed? (y/n): ").strip().lower() == "y"
+
+    consolidated = input("Write one compressed dataset instead of a CSV per code? (y/n): ").strip().lower() == "y"
+
     output_folder = "csv-exports/qr-code-exports"
 
-    process_qr_codes(csv_filename, access_token, output_folder)
\ No newline at end of file
+    process_qr_codes(csv_filename, access_token, output_folder, incremental=incremental, force=force,
+                     consolidated=consolidated)
\ No newline at end of file
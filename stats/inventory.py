@@ -0,0 +1,147 @@
+"""Local SQLite inventory of an account's QR codes.
+
+Keeps every field the summary needs so daily reports can be built from disk.
+An incremental sync walks the code list from page 1 (newest first) and stops
+at the first page that holds nothing new or changed; a full sync refetches
+everything and is used for the first run or when counts no longer match.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+from qrcg.records import QRCode
+
+INVENTORY_FOLDER = "csv-exports"
+
+FIELDS = (
+    "id", "created", "title", "short_url", "target_url",
+    "type_name", "total_scans", "unique_scans", "status", "folder_id",
+)
+
+
+def inventory_path(access_token):
+    token_hash = hashlib.sha256(access_token.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(INVENTORY_FOLDER, f"qr_inventory_{token_hash}.db")
+
+
+def open_inventory(access_token):
+    path = inventory_path(access_token)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS qr_codes (
+            id INTEGER PRIMARY KEY,
+            created TEXT,
+            title TEXT,
+            short_url TEXT,
+            target_url TEXT,
+            type_name TEXT,
+            total_scans INTEGER,
+            unique_scans INTEGER,
+            status TEXT,
+            folder_id INTEGER,
+            synced_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_qr_codes_type ON qr_codes (type_name);
+        CREATE INDEX IF NOT EXISTS idx_qr_codes_status ON qr_codes (status);
+    """)
+
+    # Inventories created before folders were tracked; the next sync fills the column in.
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(qr_codes)")}
+    if "folder_id" not in columns:
+        conn.execute("ALTER TABLE qr_codes ADD COLUMN folder_id INTEGER")
+        conn.commit()
+
+    return conn
+
+
+def to_row(qr):
+    return (
+        qr.id,
+        qr.created,
+        qr.title,
+        qr.short_url or "",
+        qr.target_url,
+        qr.type_name or "Unknown",
+        qr.total_scans or 0,
+        qr.unique_scans or 0,
+        qr.status,
+        qr.folder_id,
+    )
+
+
+def upsert_codes(conn, qr_codes):
+    """Store a page of codes and return how many were new or changed."""
+    rows = [to_row(qr) for qr in qr_codes]
+    ids = [row[0] for row in rows]
+
+    known = set()
+    if ids:
+        placeholders = ",".join("?" * len(ids))
+        query = f"SELECT {', '.join(FIELDS)} FROM qr_codes WHERE id IN ({placeholders})"
+        known = {tuple(row) for row in conn.execute(query, ids)}
+
+    changed = [row for row in rows if row not in known]
+    now = time.time()
+    conn.executemany(
+        f"INSERT OR REPLACE INTO qr_codes ({', '.join(FIELDS)}, synced_at) VALUES ({', '.join('?' * (len(FIELDS) + 1))})",
+        [row + (now,) for row in changed],
+    )
+    conn.commit()
+    return len(changed)
+
+
+def replace_codes(conn, pages):
+    conn.execute("DELETE FROM qr_codes")
+    for qr_codes in pages:
+        upsert_codes(conn, qr_codes)
+
+
+def count_codes(conn):
+    return conn.execute("SELECT COUNT(*) FROM qr_codes").fetchone()[0]
+
+
+def sync_inventory(conn, total_codes, per_page, fetch_page, fetch_all, full=False):
+    """Bring the inventory up to date.
+
+    ``fetch_page(page)`` returns one page of codes (None on failure) and
+    ``fetch_all()`` yields every page of codes in the account. Returns the number of
+    new or changed codes, or None when a full refresh was done.
+    """
+    if full or count_codes(conn) == 0:
+        replace_codes(conn, fetch_all())
+        return None
+
+    changed = 0
+    page = 1
+    while True:
+        qr_codes = fetch_page(page)
+        if qr_codes is None:
+            break
+
+        page_changed = upsert_codes(conn, qr_codes)
+        changed += page_changed
+
+        if page_changed == 0 or len(qr_codes) < per_page:
+            break
+        page += 1
+
+    # Deleted codes never show up on a page, so a count mismatch needs a full refresh.
+    if count_codes(conn) != total_codes:
+        replace_codes(conn, fetch_all())
+        return None
+
+    return changed
+
+
+def iter_inventory(conn, per_page):
+    """Yield the stored codes, newest first, one page-sized list at a time."""
+    cursor = conn.execute(f"SELECT {', '.join(FIELDS)} FROM qr_codes ORDER BY id DESC")
+    while True:
+        rows = cursor.fetchmany(per_page)
+        if not rows:
+            return
+        yield [QRCode(**dict(row)) for row in rows]
@@ -1,14 +1,22 @@
+import argparse
 import os
-import requests
+import sys
 import csv
-import re
 import traceback
 import time
 from rich.console import Console
 from rich.prompt import Prompt
 from datetime import datetime
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from qrcg import client, quota
+from qrcg.records import QRCode
 from granular_statistics import process_qr_codes
+import inventory
+import summary
 
 console = Console()
 
@@ -17,6 +25,8 @@ console = Console()
 # -------------------------
 PER_PAGE = 100
 MAX_SAFE_PAGES = 5000
+PAGE_WORKERS = 4
+PAGE_REFETCH_PASSES = 1
 
 
 # -------------------------
@@ -27,26 +37,16 @@ def debug(message, level="INFO"):
     console.print(f"[grey][{timestamp}][{level}] {message}[/grey]")
 
 
-# -------------------------
-# CLEANER
-# -------------------------
-def remove_rich_formatting(text):
-    try:
-        return re.sub(r'\[.*?\]', '', str(text))
-    except Exception:
-        return text
-
-
 # -------------------------
 # FETCH TOTAL COUNT
 # -------------------------
 def get_total_qr_codes(access_token):
     debug("Fetching total QR code count")
 
-    url = f"https://api.qr-code-generator.com/v1/account?access-token={access_token}"
+    url = client.v1_url(f"account?access-token={access_token}")
 
     try:
-        response = requests.get(url)
+        response = client.get_cached(url)
         debug(f"Account endpoint status: {response.status_code}")
 
         if response.status_code != 200:
@@ -72,126 +72,131 @@ def get_total_qr_codes(access_token):
 # -------------------------
 # FETCH QR CODE PAGES
 # -------------------------
-def fetch_qr_pages(access_token, total_pages):
-    debug(f"Fetching {total_pages} pages")
+def fetch_qr_page(base_url, page, total_pages):
+    """Fetch a single page. Returns the page's codes, or None if the page failed."""
+    url = f"{base_url}&page={page}"
+    debug(f"Fetching page {page}/{total_pages}")
 
-    base_url = f"https://api.qr-code-generator.com/v1/codes?access-token={access_token}&per-page={PER_PAGE}"
+    try:
+        start_time = time.time()
+        response = client.get(url)
+        elapsed = time.time() - start_time
 
-    qr_codes = []
+        debug(f"Response {page}: {response.status_code} ({elapsed:.2f}s)")
 
-    with console.status("[bold green]Fetching QR codes..."):
-        for page in range(1, total_pages + 1):
-            url = f"{base_url}&page={page}"
-            debug(f"Fetching page {page}/{total_pages}")
+        if response.status_code != 200:
+            debug(f"Failed page {page}: {response.text}", "ERROR")
+            return None
 
-            try:
-                start_time = time.time()
-                response = requests.get(url)
-                elapsed = time.time() - start_time
+        try:
+            data = response.json()
+        except Exception as json_err:
+            debug(f"JSON parse failed on page {page}: {json_err}", "ERROR")
+            return None
 
-                debug(f"Response {page}: {response.status_code} ({elapsed:.2f}s)")
+        qr_codes_page = [QRCode.from_api(qr) for qr in (data if isinstance(data, list) else data.get("data", []))]
 
-                if response.status_code != 200:
-                    debug(f"Failed page {page}: {response.text}", "ERROR")
-                    continue
+        if not qr_codes_page:
+            debug(f"Empty page {page} (unexpected)", "WARNING")
 
-                try:
-                    data = response.json()
-                except Exception as json_err:
-                    debug(f"JSON parse failed on page {page}: {json_err}", "ERROR")
-                    continue
+        return qr_codes_page
+
+    except Exception as e:
+        debug(f"Request failed on page {page}: {e}", "CRITICAL")
+        traceback.print_exc()
+        return None
 
-                qr_codes_page = data if isinstance(data, list) else data.get("data", [])
 
-                if not qr_codes_page:
-                    debug(f"Empty page {page} (unexpected)", "WARNING")
-                    continue
+def fetch_qr_pages(access_token, total_pages, workers=PAGE_WORKERS):
+    """Yield each page of codes in order while later pages are already being fetched."""
+    debug(f"Fetching {total_pages} pages ({workers} in flight)")
 
-                qr_codes.extend(qr_codes_page)
+    base_url = client.v1_url(f"codes?access-token={access_token}&per-page={PER_PAGE}")
 
-            except Exception as e:
-                debug(f"Request failed on page {page}: {e}", "CRITICAL")
-                traceback.print_exc()
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        next_page = 1
+
+        while in_flight or next_page <= total_pages:
+            # Only a few pages ahead of the consumer are ever held in memory.
+            while next_page <= total_pages and len(in_flight) < workers * 2:
+                in_flight.append((next_page, executor.submit(fetch_qr_page, base_url, next_page, total_pages)))
+                next_page += 1
+
+            page, future = in_flight.popleft()
+            result = future.result()
+
+            for _ in range(PAGE_REFETCH_PASSES):
+                if result is not None:
+                    break
+                debug(f"Re-fetching failed page {page}", "WARNING")
+                result = fetch_qr_page(base_url, page, total_pages)
+
+            if result is None:
+                failed.append(page)
                 continue
 
-    debug(f"Total QR codes fetched: {len(qr_codes)}")
-    return qr_codes
+            yield result
+
+    if failed:
+        debug(f"Pages still failing after re-fetch: {failed}", "ERROR")
+        console.print(f"[bold red]Warning: {len(failed)} page(s) could not be fetched: {failed}[/bold red]")
 
 
 # -------------------------
 # PROCESS QR CODES
 # -------------------------
-def process_qr_data(qr_codes):
+def process_qr_data(pages, writer=None):
+    """Summarise pages of codes as they arrive, writing each page's rows to ``writer`` if given."""
     debug("Processing QR codes")
 
-    static_qr_count = 0
-    dynamic_qr_count = 0
-    total_scans_all_time = 0
+    totals = summary.RunningSummary()
 
-    static_qr_types = defaultdict(int)
-    dynamic_qr_types = defaultdict(lambda: {'count': 0, 'scans': 0})
+    with console.status("[bold green]Fetching and processing QR codes..."):
+        for qr_codes in pages:
+            table = summary.QRCodeTable()
+            for qr in qr_codes:
+                try:
+                    table.append(qr)
+                except Exception as e:
+                    debug(f"Processing error: {e}", "ERROR")
+                    traceback.print_exc()
 
-    qr_code_data = []
+            totals.add(table)
+            if writer is not None:
+                writer.writerows(table.rows())
 
-    with console.status("[bold green]Processing QR codes..."):
-        for qr in qr_codes:
-            try:
-                id = qr.get("id", "N/A")
-                created = qr.get("created", "N/A")
-                title = qr.get("title")
-                short_url = qr.get("short_url", "")
-                target_url = qr.get("target_url")
-                type_name = qr.get("type_name", "Unknown")
-                total_scans = qr.get("total_scans", 0)
-                unique_scans = qr.get("unique_scans", 0)
-                status = (qr.get("status") or "unknown").lower()
-
-                is_dynamic = bool(short_url)
-
-                # Counters
-                if is_dynamic:
-                    dynamic_qr_count += 1
-                    dynamic_qr_types[type_name]['count'] += 1
-                    dynamic_qr_types[type_name]['scans'] += total_scans
-                    if isinstance(total_scans, int):
-                        total_scans_all_time += total_scans
-                else:
-                    static_qr_count += 1
-                    static_qr_types[type_name] += 1
-
-                qr_code_data.append({
-                    "Created": remove_rich_formatting(created),
-                    "ID": remove_rich_formatting(str(id)),
-                    "Title": remove_rich_formatting(title),
-                    "Short URL": remove_rich_formatting(short_url),
-                    "Target URL": remove_rich_formatting(target_url),
-                    "Solution Type": remove_rich_formatting(type_name),
-                    "QR Code Type": "Dynamic" if is_dynamic else "Static",
-                    "Status": status,
-                    "Total Scans": str(total_scans) if is_dynamic else "",
-                    "Unique Scans": str(unique_scans) if is_dynamic else "",
-                })
-
-            except Exception as e:
-                debug(f"Processing error: {e}", "ERROR")
-                traceback.print_exc()
+    debug(f"Total QR codes processed: {totals.count}")
 
     return {
-        "static_count": static_qr_count,
-        "dynamic_count": dynamic_qr_count,
-        "total_scans": total_scans_all_time,
-        "data": qr_code_data
+        "static_count": totals.static_count,
+        "dynamic_count": totals.dynamic_count,
+        "total_scans": totals.scans,
+        "data": totals,
     }
 
 
+def print_breakdowns(totals, top_n=10):
+    for name, label in (("kind", "QR CODE TYPE"), ("type", "SOLUTION TYPE"), ("status", "STATUS"),
+                        ("folder", "FOLDER"), ("month", "CREATED MONTH")):
+        groups = totals.group_by(name)
+        order = sorted(groups) if name == "month" else sorted(groups, key=lambda v: -groups[v]["count"])
+
+        console.print(f"[bold magenta]BY {label}:[/bold magenta]")
+        for value in order:
+            console.print(f"  {value}: {groups[value]['count']} codes, {groups[value]['scans']} scans")
+
+    console.print(f"[bold magenta]TOP {top_n} BY SCANS:[/bold magenta]")
+    for qr_id, title, scans in totals.top(top_n):
+        console.print(f"  {qr_id} {title}: {scans}")
+
+
 # -------------------------
 # EXPORT CSV
 # -------------------------
-def export_csv(qr_code_data):
-    if not qr_code_data:
-        debug("No data to export", "WARNING")
-        return None
-
+def export_csv(pages):
+    """Process ``pages`` while writing every code to a new summary CSV. Returns (results, filename)."""
     folder = "csv-exports"
     os.makedirs(folder, exist_ok=True)
 
@@ -200,25 +205,52 @@ def export_csv(qr_code_data):
         f"QR_CODE_DATA_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     )
 
+    with open(filename, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=summary.EXPORT_FIELDS)
+        writer.writeheader()
+        results = process_qr_data(pages, writer)
+
+    if not results["data"].count:
+        debug("No data to export", "WARNING")
+        os.remove(filename)
+        return results, None
+
+    debug(f"CSV written: {filename}")
+    return results, filename
+
+
+# -------------------------
+# LOCAL INVENTORY
+# -------------------------
+def sync_inventory(access_token, total_codes, total_pages, full=False):
+    conn = inventory.open_inventory(access_token)
+    base_url = client.v1_url(f"codes?access-token={access_token}&per-page={PER_PAGE}")
+
     try:
-        with open(filename, mode='w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=qr_code_data[0].keys())
-            writer.writeheader()
-            writer.writerows(qr_code_data)
+        changed = inventory.sync_inventory(
+            conn,
+            total_codes,
+            PER_PAGE,
+            fetch_page=lambda page: fetch_qr_page(base_url, page, total_pages),
+            fetch_all=lambda: fetch_qr_pages(access_token, total_pages),
+            full=full,
+        )
 
-        debug(f"CSV written: {filename}")
-        return filename
+        if changed is None:
+            debug(f"Inventory fully refreshed: {inventory.inventory_path(access_token)}")
+        else:
+            debug(f"Inventory synced incrementally: {changed} new or changed code(s)")
 
-    except Exception as e:
-        debug(f"CSV export failed: {e}", "CRITICAL")
-        traceback.print_exc()
-        return None
+        yield from inventory.iter_inventory(conn, PER_PAGE)
+    finally:
+        conn.close()
 
 
 # -------------------------
 # MAIN FUNCTION
 # -------------------------
-def fetch_qr_codes(access_token):
+def fetch_qr_codes(access_token, use_inventory=False, full_sync=False, incremental=False, force_export=False,
+                   consolidated=False, breakdowns=False):
     total_codes = get_total_qr_codes(access_token)
 
     if total_codes is None:
@@ -230,26 +262,47 @@ def fetch_qr_codes(access_token):
 
     debug(f"Total pages to fetch: {total_pages}")
 
-    qr_codes = fetch_qr_pages(access_token, total_pages)
+    # Rows are written while pages arrive, so decide on the CSV before fetching.
+    want_csv = Prompt.ask("Download CSV summary data? (y/n)", default="n").lower() == "y"
+
+    # An incremental inventory sync only fetches what changed, so only full walks are checked.
+    if (not use_inventory or full_sync) and not quota.plan("Statistics summary", total_pages, {access_token: 1},
+                                                           unit_name="pages", allow_shrink=False):
+        console.print("[red]Cancelled before fetching[/red]")
+        return
+
+    if use_inventory:
+        pages = sync_inventory(access_token, total_codes, total_pages, full=full_sync)
+    else:
+        pages = fetch_qr_pages(access_token, total_pages)
+
+    csv_file = None
 
-    results = process_qr_data(qr_codes)
+    if want_csv:
+        try:
+            results, csv_file = export_csv(pages)
+        except Exception as e:
+            debug(f"CSV export failed: {e}", "CRITICAL")
+            traceback.print_exc()
+            return
+    else:
+        results = process_qr_data(pages)
 
     console.print(f"[bold magenta]TOTAL STATIC:[/bold magenta] {results['static_count']}")
     console.print(f"[bold magenta]TOTAL DYNAMIC:[/bold magenta] {results['dynamic_count']}")
     console.print(f"[bold magenta]TOTAL SCANS:[/bold magenta] {results['total_scans']}")
 
+    if breakdowns:
+        print_breakdowns(results["data"])
+
     # -------------------------
     # EXPORT FLOW
     # -------------------------
-    csv_file = None
-
-    if Prompt.ask("Download CSV summary data? (y/n)", default="n").lower() == "y":
-        csv_file = export_csv(results["data"])
-
     if csv_file:
         if Prompt.ask("Download granular QR code data? (y/n)", default="n").lower() == "y":
             try:
-                process_qr_codes(csv_file, access_token, "csv-exports/qr-code-exports")
+                process_qr_codes(csv_file, access_token, "csv-exports/qr-code-exports", incremental=incremental,
+                                 force=force_export, consolidated=consolidated)
             except Exception as e:
                 debug(f"Granular processing failed: {e}", "ERROR")
                 traceback.print_exc()
@@ -258,11 +311,38 @@ def fetch_qr_codes(access_token):
 # -------------------------
 # ENTRY POINT
 # -------------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Global and per-code statistics for an account's QR Codes.")
+    parser.add_argument("--inventory", action="store_true",
+                        help="keep a local SQLite inventory and only fetch new or changed codes")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="with --inventory, refetch every code instead of syncing incrementally")
+    parser.add_argument("--incremental", action="store_true",
+                        help="granular exports only fetch complete days since each code's last export and append them")
+    parser.add_argument("--force-export", action="store_true",
+                        help="granular exports include codes whose scan counts have not changed since the last export")
+    parser.add_argument("--dataset", action="store_true",
+                        help="write granular exports to gzip NDJSON files partitioned by month instead of a CSV per code")
+    parser.add_argument("--breakdown", action="store_true",
+                        help="also print counts and scans by type, status, folder and created month, and the most scanned codes")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     debug("Script started")
 
     access_token = Prompt.ask("Enter API token")
 
-    fetch_qr_codes(access_token)
+    fetch_qr_codes(
+        access_token,
+        use_inventory=args.inventory,
+        full_sync=args.full_sync,
+        incremental=args.incremental,
+        force_export=args.force_export,
+        consolidated=args.dataset,
+        breakdowns=args.breakdown,
+    )
 
     debug("Script finished")
\ No newline at end of file
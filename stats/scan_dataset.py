@@ -0,0 +1,99 @@
+"""Consolidated output for granular exports.
+
+Instead of one CSV per QR code, scan rows from every code go into gzip
+NDJSON files partitioned by scan month (``scans_YYYY-MM.ndjson.gz``), each
+row tagged with its ``qr_code_id``. A code's rows are staged in a temporary
+file until its export has been read completely, then buffered and appended
+in batches; every batch becomes one gzip member, which standard gzip readers
+concatenate transparently.
+"""
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import defaultdict
+
+BATCH_ROWS = 5000
+DATE_COLUMN = "Date/time"
+
+MONTH_PATTERN = re.compile(r"^(\d{4})-(\d{2})")
+
+
+def partition_for(row):
+    match = MONTH_PATTERN.match(row.get(DATE_COLUMN) or "")
+    return f"{match.group(1)}-{match.group(2)}" if match else "unknown"
+
+
+class ScanDataset:
+    def __init__(self, folder, batch_rows=BATCH_ROWS):
+        self.folder = folder
+        self.batch_rows = batch_rows
+        self.buffer = defaultdict(list)
+        self.buffered = 0
+        self.on_flushed = []
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def write(self, qr_code_id, rows, on_flushed=None):
+        """Queue ``rows`` for ``qr_code_id`` in one go; ``on_flushed`` runs once they are on disk."""
+        with self.lock:
+            for row in rows:
+                record = {"qr_code_id": str(qr_code_id)}
+                record.update(row)
+                self.buffer[partition_for(row)].append(record)
+                self.buffered += 1
+                if self.buffered >= self.batch_rows:
+                    self._flush()
+
+            if on_flushed is not None:
+                self.on_flushed.append(on_flushed)
+
+    def stage(self, qr_code_id):
+        return StagedRows(self, qr_code_id)
+
+    def _flush(self):
+        for partition, records in self.buffer.items():
+            path = os.path.join(self.folder, f"scans_{partition}.ndjson.gz")
+            with gzip.open(path, mode='at', encoding='utf-8') as file:
+                file.writelines(json.dumps(record) + "\n" for record in records)
+
+        callbacks = self.on_flushed
+        self.buffer = defaultdict(list)
+        self.buffered = 0
+        self.on_flushed = []
+
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+
+
+class StagedRows:
+    """One code's rows, spooled to disk until its export has been read completely.
+
+    Nothing reaches the dataset unless ``commit`` is called, so a code that
+    fails halfway leaves no partial rows for the retry to duplicate.
+    """
+
+    def __init__(self, dataset, qr_code_id):
+        self.dataset = dataset
+        self.qr_code_id = qr_code_id
+        fd, self.path = tempfile.mkstemp(prefix=".staged-", suffix=".ndjson", dir=dataset.folder)
+        self.file = os.fdopen(fd, mode='w', encoding='utf-8')
+
+    def add(self, row):
+        self.file.write(json.dumps(row) + "\n")
+
+    def commit(self, on_flushed=None):
+        self.file.close()
+        with open(self.path, mode='r', encoding='utf-8') as file:
+            self.dataset.write(self.qr_code_id, (json.loads(line) for line in file), on_flushed=on_flushed)
+        os.remove(self.path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.path)
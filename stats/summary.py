@@ -0,0 +1,192 @@
+"""Columnar summary of an account's QR codes.
+
+Codes are stored column by column: scan counters and the static/dynamic flag
+in typed arrays, and every grouping field (type, status, kind, folder, created
+month) as an array of small integer codes into a list of distinct values. A
+group-by is then a single pass over two arrays, and per-code export rows are
+only built when they are written out. A RunningSummary merges one page-sized
+table at a time, so a whole account is summarised without keeping its codes.
+"""
+import heapq
+import re
+from array import array
+
+GROUPS = ("type", "status", "kind", "folder", "month")
+
+EXPORT_FIELDS = (
+    "Created", "ID", "Title", "Short URL", "Target URL", "Solution Type",
+    "QR Code Type", "Status", "Total Scans", "Unique Scans",
+)
+
+RICH_MARKUP = re.compile(r'\[.*?\]')
+MONTH_PATTERN = re.compile(r"^\d{4}-\d{2}")
+
+
+def clean(value):
+    text = str(value)
+    # Rich markup needs a "[", so most fields never reach the regex.
+    if "[" not in text:
+        return text
+    return RICH_MARKUP.sub("", text)
+
+
+def to_int(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Categories:
+    """One grouping column: each row stores the index of its value."""
+
+    def __init__(self):
+        self.values = []
+        self.lookup = {}
+        self.codes = array("I")
+
+    def append(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+
+class QRCodeTable:
+    def __init__(self):
+        self.ids = []
+        self.created = []
+        self.titles = []
+        self.short_urls = []
+        self.target_urls = []
+        self.dynamic = array("b")
+        self.total_scans = array("q")
+        self.unique_scans = array("q")
+        self.groups = {name: Categories() for name in GROUPS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, qr):
+        """Add one ``qrcg.records.QRCode``."""
+        short_url = qr.short_url or ""
+        created = qr.created or "N/A"
+        is_dynamic = bool(short_url)
+
+        self.ids.append(clean(qr.id if qr.id is not None else "N/A"))
+        self.created.append(clean(created))
+        self.titles.append(clean(qr.title))
+        self.short_urls.append(clean(short_url))
+        self.target_urls.append(clean(qr.target_url))
+        self.dynamic.append(is_dynamic)
+        # Static codes are not tracked, so their counters never count towards totals.
+        self.total_scans.append(to_int(qr.total_scans) if is_dynamic else 0)
+        self.unique_scans.append(to_int(qr.unique_scans) if is_dynamic else 0)
+
+        month = MONTH_PATTERN.match(str(created))
+        self.groups["type"].append(clean(qr.type_name or "Unknown"))
+        self.groups["status"].append((qr.status or "unknown").lower())
+        self.groups["kind"].append("Dynamic" if is_dynamic else "Static")
+        self.groups["folder"].append(str(qr.folder_id or "No folder"))
+        self.groups["month"].append(month.group(0) if month else "unknown")
+
+    @property
+    def dynamic_count(self):
+        return sum(self.dynamic)
+
+    @property
+    def static_count(self):
+        return len(self) - self.dynamic_count
+
+    @property
+    def scans(self):
+        return sum(self.total_scans)
+
+    def group_by(self, name):
+        """Return ``{value: {"count": n, "scans": total}}`` for one grouping column."""
+        column = self.groups[name]
+        counts = [0] * len(column.values)
+        scans = [0] * len(column.values)
+
+        for code, total in zip(column.codes, self.total_scans):
+            counts[code] += 1
+            scans[code] += total
+
+        return {
+            value: {"count": counts[code], "scans": scans[code]}
+            for code, value in enumerate(column.values)
+            if counts[code]
+        }
+
+    def top(self, n=10):
+        """The ``n`` most scanned codes as ``(id, title, scans)``."""
+        best = heapq.nlargest(n, range(len(self)), key=self.total_scans.__getitem__)
+        return [(self.ids[i], self.titles[i], self.total_scans[i]) for i in best]
+
+    def row(self, i):
+        is_dynamic = self.dynamic[i]
+        return {
+            "Created": self.created[i],
+            "ID": self.ids[i],
+            "Title": self.titles[i],
+            "Short URL": self.short_urls[i],
+            "Target URL": self.target_urls[i],
+            "Solution Type": self.groups["type"][i],
+            "QR Code Type": self.groups["kind"][i],
+            "Status": self.groups["status"][i],
+            "Total Scans": str(self.total_scans[i]) if is_dynamic else "",
+            "Unique Scans": str(self.unique_scans[i]) if is_dynamic else "",
+        }
+
+    def rows(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+
+class RunningSummary:
+    """Totals, group-bys and top-N merged from one page-sized table at a time."""
+
+    def __init__(self, top_n=10):
+        self.count = 0
+        self.dynamic_count = 0
+        self.scans = 0
+        self.groups = {name: {} for name in GROUPS}
+        self.top_n = top_n
+        self.best = []
+        self.seen = 0
+
+    @property
+    def static_count(self):
+        return self.count - self.dynamic_count
+
+    def add(self, table):
+        self.count += len(table)
+        self.dynamic_count += table.dynamic_count
+        self.scans += table.scans
+
+        for name in GROUPS:
+            merged = self.groups[name]
+            for value, stats in table.group_by(name).items():
+                totals = merged.setdefault(value, {"count": 0, "scans": 0})
+                totals["count"] += stats["count"]
+                totals["scans"] += stats["scans"]
+
+        for qr_id, title, scans in table.top(self.top_n):
+            # Ties keep the code seen first, like heapq.nlargest on the full list would.
+            item = (scans, -self.seen, qr_id, title)
+            self.seen += 1
+            if len(self.best) < self.top_n:
+                heapq.heappush(self.best, item)
+            elif item > self.best[0]:
+                heapq.heapreplace(self.best, item)
+
+    def group_by(self, name):
+        return self.groups[name]
+
+    def top(self, n=None):
+        ranked = sorted(self.best, reverse=True)[:n]
+        return [(qr_id, title, scans) for scans, _, qr_id, title in ranked]